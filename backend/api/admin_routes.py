@@ -1,58 +1,171 @@
-from flask import Blueprint, jsonify, g, request
+import json
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, jsonify, g, request, stream_with_context
 from models.driver import Driver, DriverScore
-from models.feedback import Feedback
+from models.feedback import Feedback, FeedbackEntityType
+from models.entity_score import EntityScore
 from config import Config
-from functools import wraps
-from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_jwt_extended import create_access_token
+from api.decorator import STREAM_TOKEN_SCOPE, admin_required
+from services.config_store import runtime_config
+from services.scoring_service import default_aggregators
 
+# The 'distribution_service', 'queue_service', 'event_broadcaster',
+# 'dedup_service', 'config_store', 'alert_dispatcher', 'sentiment_cache'
+# and 'scoring_service' will be injected from app.py
 admin_bp = Blueprint("admin_bp", __name__)
 
+
+def _fleet_rank(score):
+    """
+    Places a score within the current fleet distribution snapshot.
+    """
+    distribution = getattr(admin_bp, 'distribution_service', None)
+    if distribution is None:
+        return None
+
+    snapshot = distribution.get_snapshot()
+    percentile_rank = snapshot.percentile_rank(score) if score is not None else None
+
+    return {
+        "percentile_rank": round(percentile_rank, 2) if percentile_rank is not None else None,
+        "bottom_percentile": Config.FLEET_BOTTOM_PERCENTILE,
+        "is_bottom_of_fleet": percentile_rank is not None and percentile_rank < Config.FLEET_BOTTOM_PERCENTILE,
+        "fleet_size": len(snapshot),
+        "snapshot_age_seconds": round(snapshot.age_seconds(), 1)
+    }
+
+
 # -------------------------
-#  Admin-only access decorator
+#  Admin Routes
 # -------------------------
-def admin_required():
+
+# Request/response key -> Config attribute, for the scalar settings
+_CONFIG_FIELDS = {
+    "alert_threshold": "ALERT_THRESHOLD",
+    "ema_alpha": "EMA_ALPHA",
+    "alert_throttle_minutes": "ALERT_THROTTLE_MINUTES",
+    "negative_rate_alert_enabled": "NEGATIVE_RATE_ALERT_ENABLED",
+    "negative_rate_threshold": "NEGATIVE_RATE_THRESHOLD",
+    "negative_rate_window_size": "NEGATIVE_RATE_WINDOW_SIZE",
+    "negative_rate_window_minutes": "NEGATIVE_RATE_WINDOW_MINUTES",
+    "negative_rate_min_samples": "NEGATIVE_RATE_MIN_SAMPLES",
+    "rate_limit_enabled": "RATE_LIMIT_ENABLED",
+    "rate_limit_by_ip": "RATE_LIMIT_BY_IP",
+}
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Request key -> (check, description of a valid value). Every value is
+# checked before it is published: a bad one would reach every process.
+_CONFIG_CHECKS = {
+    "alert_threshold": (_is_number, "a number"),
+    "ema_alpha": (lambda v: _is_number(v) and 0 < v <= 1, "a number in (0, 1]"),
+    "alert_throttle_minutes": (lambda v: _is_number(v) and v >= 0, "a non-negative number"),
+    "negative_rate_alert_enabled": (lambda v: isinstance(v, bool), "true or false"),
+    "negative_rate_threshold": (lambda v: _is_number(v) and 0 < v <= 1, "a number in (0, 1]"),
+    # A zero-sized window would break every driver's negative-rate tracking
+    "negative_rate_window_size": (lambda v: _is_int(v) and v >= 1, "a positive integer"),
+    "negative_rate_window_minutes": (lambda v: _is_int(v) and v >= 0, "a non-negative integer (0 uses the size window)"),
+    "negative_rate_min_samples": (lambda v: _is_int(v) and v >= 1, "a positive integer"),
+    "rate_limit_enabled": (lambda v: isinstance(v, bool), "true or false"),
+    "rate_limit_by_ip": (lambda v: isinstance(v, bool), "true or false"),
+}
+
+
+def _config_error(data):
     """
-    Custom decorator that verifies a valid JWT and enforces admin-only access.
+    Returns an error message for the first invalid setting in `data`, or None.
     """
-    def wrapper(fn):
-        @wraps(fn)
-        def decorator(*args, **kwargs):
-            try:
-                # Verify JWT presence and validity
-                verify_jwt_in_request()
-                claims = get_jwt()
+    if not isinstance(data, dict):
+        return "Request body must be a JSON object."
 
-                # Require role=admin
-                if claims.get("role") != "admin":
-                    return jsonify({"error": "Access forbidden: Admin role required."}), 403
+    for key, (check, expected) in _CONFIG_CHECKS.items():
+        if key in data and not check(data[key]):
+            return f"'{key}' must be {expected}"
 
-                # Proceed to protected route
-                return fn(*args, **kwargs)
+    # With the count window, the rule can never fire if it needs more
+    # samples than the window holds
+    current = runtime_config()
+    window_size = data.get("negative_rate_window_size", current.NEGATIVE_RATE_WINDOW_SIZE)
+    window_minutes = data.get("negative_rate_window_minutes", current.NEGATIVE_RATE_WINDOW_MINUTES)
+    min_samples = data.get("negative_rate_min_samples", current.NEGATIVE_RATE_MIN_SAMPLES)
+    if not window_minutes and min_samples > window_size:
+        return (f"'negative_rate_min_samples' ({min_samples}) cannot exceed "
+                f"'negative_rate_window_size' ({window_size}) when 'negative_rate_window_minutes' is 0")
 
-            except Exception as e:
-                # Missing, expired, or invalid token
-                return jsonify({"error": f"Authentication error: {str(e)}"}), 401
+    # Settings are persisted for every process, so unknown keys are
+    # rejected rather than stored
+    entity_types = [t.value for t in FeedbackEntityType]
 
-        return decorator
-    return wrapper
+    feature_flags = data.get("feature_flags", {})
+    if not isinstance(feature_flags, dict) or not all(isinstance(v, bool) for v in feature_flags.values()):
+        return "'feature_flags' must map entity types to true or false"
+    unknown = sorted(set(feature_flags) - set(entity_types))
+    if unknown:
+        return f"Unknown entity types in 'feature_flags': {unknown}. Must be one of: {entity_types}"
 
+    rate_limits = data.get("rate_limits", {})
+    if not isinstance(rate_limits, dict):
+        return "'rate_limits' must map entity types to limits"
+    unknown = sorted(set(rate_limits) - set(entity_types) - {"default"})
+    if unknown:
+        return f"Unknown entity types in 'rate_limits': {unknown}. Must be 'default' or one of: {entity_types}"
+    for entity_type, limits in rate_limits.items():
+        if not (isinstance(limits, dict)
+                and _is_number(limits.get("rate_per_minute")) and limits["rate_per_minute"] > 0
+                and _is_int(limits.get("burst")) and limits["burst"] >= 1):
+            return f"Invalid rate limit for '{entity_type}': needs positive 'rate_per_minute' and 'burst'"
+    return None
+
+
+def _current_config():
+    snapshot = runtime_config()
+    config = {key: getattr(snapshot, attr) for key, attr in _CONFIG_FIELDS.items()}
+    config["feature_flags"] = dict(snapshot.FEATURE_FLAGS)
+    config["rate_limits"] = {key: dict(limits) for key, limits in snapshot.RATE_LIMITS.items()}
+    config["version"] = getattr(snapshot, "version", None)
+    return config
+
+
+def _config_workers():
+    """
+    The config version every known process last reported, flagging
+    processes that have stopped polling.
+    """
+    store = getattr(admin_bp, 'config_store', None)
+    if store is None:
+        return []
+
+    stale_after = timedelta(seconds=Config.CONFIG_POLL_SECONDS * 3)
+    now = datetime.now(timezone.utc)
+    workers = store.workers()
+    for worker in workers:
+        last_seen = datetime.fromisoformat(worker["last_seen"]) if worker["last_seen"] else None
+        if last_seen is not None and last_seen.tzinfo is None:
+            # SQLite drops the timezone; timestamps are written in UTC
+            last_seen = last_seen.replace(tzinfo=timezone.utc)
+        worker["stale"] = last_seen is None or now - last_seen > stale_after
+    return workers
 
-# -------------------------
-#  Admin Routes
-# -------------------------
 
 @admin_bp.route("/config", methods=["GET"])
 @admin_required()
 def get_config():
     """
     Fetch system configuration — accessible only to Admin users.
+    Includes the config version each running process has applied.
     """
-    return jsonify({
-        "alert_threshold": Config.ALERT_THRESHOLD,
-        "feature_flags": Config.FEATURE_FLAGS,
-        "ema_alpha": Config.EMA_ALPHA,
-        "alert_throttle_minutes": Config.ALERT_THROTTLE_MINUTES
-    })
+    config = _current_config()
+    config["workers"] = _config_workers()
+    return jsonify(config)
 
 
 @admin_bp.route("/config", methods=["POST"])
@@ -63,26 +176,43 @@ def update_config():
     """
     data = request.get_json()
 
+    error = _config_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    store = getattr(admin_bp, 'config_store', None)
+    if store is None:
+        return jsonify({"error": "Internal server error: Config store not available"}), 500
+
     # Example: update only known keys
-    if "alert_threshold" in data:
-        Config.ALERT_THRESHOLD = data["alert_threshold"]
-    if "ema_alpha" in data:
-        Config.EMA_ALPHA = data["ema_alpha"]
-    if "alert_throttle_minutes" in data:
-        Config.ALERT_THROTTLE_MINUTES = data["alert_throttle_minutes"]
+    current = runtime_config()
+    changes = {attr: data[key] for key, attr in _CONFIG_FIELDS.items() if key in data}
 
     # Feature flags can be replaced entirely or partially
     if "feature_flags" in data:
-        Config.FEATURE_FLAGS.update(data["feature_flags"])
+        changes["FEATURE_FLAGS"] = {**current.FEATURE_FLAGS, **data["feature_flags"]}
+
+    # Rate limits are merged per entity type and apply to the next request
+    if "rate_limits" in data:
+        changes["RATE_LIMITS"] = {
+            key: dict(limits) for key, limits in {**current.RATE_LIMITS, **data["rate_limits"]}.items()
+        }
+
+    # Only settings that actually change make a new version
+    current_values = current.to_dict()
+    changes = {attr: value for attr, value in changes.items() if current_values.get(attr) != value}
+    if not changes:
+        return jsonify({
+            "message": "No configuration changes",
+            "updated_config": _current_config()
+        }), 200
+
+    # Every change is published as a new immutable version for all processes
+    store.publish(changes, created_by=g.jwt_claims.get("sub"))
 
     return jsonify({
         "message": "Configuration updated successfully",
-        "updated_config": {
-            "alert_threshold": Config.ALERT_THRESHOLD,
-            "feature_flags": Config.FEATURE_FLAGS,
-            "ema_alpha": Config.EMA_ALPHA,
-            "alert_throttle_minutes": Config.ALERT_THROTTLE_MINUTES
-        }
+        "updated_config": _current_config()
     }), 200
 
 
@@ -102,6 +232,7 @@ def get_driver_analytics(driver_id):
         if not driver:
             return jsonify({"error": "Driver not found"}), 404
 
+        raw_score = None
         score_data = {
             "driver_id": driver.id,
             "name": driver.name,
@@ -109,6 +240,7 @@ def get_driver_analytics(driver_id):
             "feedback_count": 0
         }
     else:
+        raw_score = driver_score.average_sentiment_score
         score_data = {
             "driver_id": driver_score.driver.id,
             "name": driver_score.driver.name,
@@ -116,6 +248,10 @@ def get_driver_analytics(driver_id):
             "feedback_count": driver_score.feedback_count
         }
 
+    # Rank the driver against the fleet snapshot (no table scan); the
+    # snapshot holds raw scores, so rank the unrounded one
+    score_data["fleet"] = _fleet_rank(raw_score)
+
     # Get latest feedback
     feedback_history = db.query(Feedback).filter(
         Feedback.driver_id == driver_id
@@ -128,7 +264,238 @@ def get_driver_analytics(driver_id):
                 "id": f.id,
                 "text": f.text,
                 "score": f.sentiment_score,
+                "duplicate_count": f.duplicate_count,
                 "timestamp": f.created_at.isoformat()
             } for f in feedback_history
         ]
     }), 200
+
+
+@admin_bp.route("/fleet/distribution", methods=["GET"])
+@admin_required()
+def get_fleet_distribution():
+    """
+    Get the fleet-wide score distribution from the periodic snapshot — Admin only.
+    """
+    distribution = getattr(admin_bp, 'distribution_service', None)
+    if distribution is None:
+        return jsonify({"error": "Internal server error: Distribution service not available"}), 500
+
+    bins = request.args.get("bins", default=10, type=int)
+    if bins < 1 or bins > 100:
+        return jsonify({"error": "'bins' must be between 1 and 100"}), 400
+
+    snapshot = distribution.get_snapshot()
+    quantiles = {
+        f"p{int(q * 100)}": snapshot.quantile(q)
+        for q in (0.05, 0.25, 0.5, 0.75, 0.95)
+    }
+
+    return jsonify({
+        "fleet_size": len(snapshot),
+        "quantiles": quantiles,
+        "histogram": snapshot.histogram(bins=bins),
+        "snapshot_age_seconds": round(snapshot.age_seconds(), 1)
+    }), 200
+
+
+def _parse_entity_type(entity_type):
+    try:
+        return FeedbackEntityType(entity_type.upper())
+    except ValueError:
+        return None
+
+
+@admin_bp.route("/entities/<string:entity_type>", methods=["GET"])
+@admin_required()
+def list_entity_scores(entity_type):
+    """
+    List aggregated scores for every entity of one type — Admin only.
+    Optionally sorted by one aggregator, e.g. ?sort_by=negative_rate
+    """
+    db = g.db
+
+    parsed_type = _parse_entity_type(entity_type)
+    if parsed_type is None:
+        return jsonify({"error": f"Invalid entity type. Must be one of: {[t.value for t in FeedbackEntityType]}"}), 400
+
+    limit = max(1, min(request.args.get("limit", default=50, type=int), 500))
+    offset = max(0, request.args.get("offset", default=0, type=int))
+    sort_by = request.args.get("sort_by", default="count")
+
+    scoring = getattr(admin_bp, 'scoring_service', None)
+    aggregators = scoring.aggregators if scoring is not None else default_aggregators()
+    aggregator_names = [aggregator.name for aggregator in aggregators]
+    if sort_by not in aggregator_names:
+        return jsonify({"error": f"Invalid sort_by. Must be one of: {aggregator_names}"}), 400
+
+    # Page over entities using the chosen aggregator, then load all of their aggregates
+    page = db.query(EntityScore.entity_id).filter(
+        EntityScore.entity_type == parsed_type,
+        EntityScore.aggregator == sort_by
+    ).order_by(EntityScore.value.desc(), EntityScore.entity_id).offset(offset).limit(limit).all()
+    entity_ids = [row.entity_id for row in page]
+
+    rows = db.query(EntityScore).filter(
+        EntityScore.entity_type == parsed_type,
+        EntityScore.entity_id.in_(entity_ids)
+    ).all() if entity_ids else []
+
+    aggregates = {entity_id: {} for entity_id in entity_ids}
+    for row in rows:
+        aggregates[row.entity_id][row.aggregator] = row.value
+
+    return jsonify({
+        "entity_type": parsed_type.value,
+        "sort_by": sort_by,
+        "entities": [
+            {"entity_id": entity_id, "aggregates": aggregates[entity_id]}
+            for entity_id in entity_ids
+        ]
+    }), 200
+
+
+@admin_bp.route("/entities/<string:entity_type>/<string:entity_id>", methods=["GET"])
+@admin_required()
+def get_entity_scores(entity_type, entity_id):
+    """
+    Get aggregated scores for a single entity of any type — Admin only.
+    """
+    db = g.db
+
+    parsed_type = _parse_entity_type(entity_type)
+    if parsed_type is None:
+        return jsonify({"error": f"Invalid entity type. Must be one of: {[t.value for t in FeedbackEntityType]}"}), 400
+
+    rows = db.query(EntityScore).filter(
+        EntityScore.entity_type == parsed_type,
+        EntityScore.entity_id == entity_id
+    ).all()
+
+    if not rows:
+        return jsonify({"error": "Entity not found"}), 404
+
+    last_updated = max((row.last_updated for row in rows if row.last_updated), default=None)
+
+    return jsonify({
+        "entity_type": parsed_type.value,
+        "entity_id": entity_id,
+        "aggregates": {row.aggregator: row.value for row in rows},
+        "last_updated": last_updated.isoformat() if last_updated else None
+    }), 200
+
+
+@admin_bp.route("/queue/stats", methods=["GET"])
+@admin_required()
+def get_queue_stats():
+    """
+    Get per-lane feedback queue depth and wait times — Admin only.
+    """
+    queue = getattr(admin_bp, 'queue_service', None)
+    if queue is None or not hasattr(queue, 'stats'):
+        return jsonify({"error": "Queue statistics are not available"}), 404
+
+    return jsonify({"lanes": queue.stats()}), 200
+
+
+@admin_bp.route("/stream/token", methods=["POST"])
+@admin_required()
+def create_stream_token():
+    """
+    Issue a short-lived token for opening the event stream — Admin only.
+    Browsers' EventSource cannot send an Authorization header, so pass it
+    as /stream?token=...; it is rejected by every other route.
+    """
+    expires_in = Config.SSE_STREAM_TOKEN_SECONDS
+    token = create_access_token(
+        identity=g.jwt_claims["sub"],
+        additional_claims={"role": g.jwt_claims.get("role"), "scope": STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=expires_in)
+    )
+    return jsonify({"stream_token": token, "expires_in": expires_in}), 200
+
+
+@admin_bp.route("/stream", methods=["GET"])
+@admin_required(stream_token=True)
+def stream_events():
+    """
+    Server-Sent Events stream of live score updates and new alerts — Admin only.
+    Filter by driver with ?driver_id=D1&driver_id=D2 (or ?driver_id=D1,D2).
+    Authenticates with the Authorization header or ?token=<stream token>;
+    the token is only checked when the stream opens, so reconnect with a
+    fresh one once it has expired.
+    """
+    broadcaster = getattr(admin_bp, 'event_broadcaster', None)
+    if broadcaster is None:
+        return jsonify({"error": "Internal server error: Event stream not available"}), 500
+
+    driver_ids = {
+        driver_id.strip()
+        for value in request.args.getlist("driver_id")
+        for driver_id in value.split(",") if driver_id.strip()
+    }
+
+    subscription = broadcaster.subscribe(driver_ids)
+    if subscription is None:
+        return jsonify({"error": "Too many open event streams, try again later"}), 503
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while not subscription.dropped:
+                event = subscription.get(timeout=Config.SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    # Keep-alive comment so proxies don't close an idle stream
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+            # The client fell too far behind; tell it to reconnect and re-sync
+            yield "event: dropped\ndata: {}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@admin_bp.route("/dedup/stats", methods=["GET"])
+@admin_required()
+def get_dedup_stats():
+    """
+    Get near-duplicate detection counters — Admin only.
+    """
+    dedup = getattr(admin_bp, 'dedup_service', None)
+    if dedup is None:
+        return jsonify({"error": "Near-duplicate detection is not available"}), 404
+
+    return jsonify(dedup.stats()), 200
+
+
+@admin_bp.route("/alerts/delivery", methods=["GET"])
+@admin_required()
+def get_alert_delivery_stats():
+    """
+    Get webhook alert delivery counters and the outbox backlog — Admin only.
+    """
+    dispatcher = getattr(admin_bp, 'alert_dispatcher', None)
+    if dispatcher is None:
+        return jsonify({"error": "Alert dispatcher is not available"}), 404
+
+    return jsonify(dispatcher.stats()), 200
+
+
+@admin_bp.route("/sentiment/cache", methods=["GET"])
+@admin_required()
+def get_sentiment_cache_stats():
+    """
+    Get sentiment result cache hit rate and time saved — Admin only.
+    """
+    cache = getattr(admin_bp, 'sentiment_cache', None)
+    if cache is None:
+        return jsonify({"error": "Sentiment result cache is not enabled"}), 404
+
+    return jsonify(cache.stats()), 200
@@ -3,10 +3,28 @@ from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import create_access_token
 from models.user import User, UserRole
 from database import db_session
+from services.password_hasher import PasswordHasherBusy
 
 # Create a Blueprint for authentication routes
+# The 'password_hasher' will be injected from app.py
 auth_bp = Blueprint('auth_api', __name__)
 
+
+def _run_bcrypt(fn, *args):
+    """
+    Runs a bcrypt-bound call on the shared, bounded hasher pool if one
+    is configured, otherwise inline.
+    """
+    hasher = getattr(auth_bp, 'password_hasher', None)
+    if hasher is None:
+        return fn(*args)
+    return hasher.run(fn, *args)
+
+
+def _busy_response():
+    return jsonify({"error": "Server is busy, please retry shortly"}), 503, {"Retry-After": "1"}
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """
@@ -31,7 +49,7 @@ def register():
 
     try:
         new_user = User(username=username, role=role)
-        new_user.set_password(password)
+        _run_bcrypt(new_user.set_password, password)
         
         db_session.add(new_user)
         db_session.commit()
@@ -45,6 +63,9 @@ def register():
             }
         }), 201
 
+    except PasswordHasherBusy:
+        db_session.rollback()
+        return _busy_response()
     except IntegrityError:
         db_session.rollback()
         return jsonify({"error": "Database error, user may already exist"}), 409
@@ -69,7 +90,7 @@ def login():
     try:
         user = db_session.query(User).filter_by(username=username).first()
 
-        if user and user.check_password(password):
+        if user and _run_bcrypt(user.check_password, password):
             # Add role claim
             additional_claims = {"role": user.role.value}
             access_token = create_access_token(
@@ -86,6 +107,9 @@ def login():
 
         return jsonify({"error": "Invalid username or password"}), 401
 
+    except PasswordHasherBusy:
+        return _busy_response()
+
     except Exception as e:
         print(f"[LOGIN ERROR] {e}")
         return jsonify({"error": "Internal server error"}), 500
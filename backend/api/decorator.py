@@ -1,30 +1,118 @@
 from functools import wraps
-from flask_jwt_extended import get_jwt, verify_jwt_in_request
-from flask import jsonify
+from flask_jwt_extended import decode_token, get_jwt, verify_jwt_in_request
+from flask_jwt_extended.exceptions import WrongTokenError
+from flask import current_app, g, jsonify, request
+from config import Config
+from services.claims_cache import VerifiedClaimsCache
 
-def admin_required():
+# Shared by every admin route; see VerifiedClaimsCache for expiry rules
+claims_cache = VerifiedClaimsCache()
+
+# `scope` claim of the short-lived tokens that may only open the event
+# stream. Every other route rejects them.
+STREAM_TOKEN_SCOPE = "stream"
+
+def _check_scope(claims, scope=None):
+    if claims.get("scope") != scope:
+        raise WrongTokenError("Token is not valid for this endpoint")
+
+def token_from_header(app_config, header: str):
+    """
+    Returns the raw JWT from an auth header value, honouring the app's
+    JWT_HEADER_TYPE, or None. Shared with the asyncio ingest app so both
+    front ends accept the same tokens.
+    """
+    header_type = app_config.get("JWT_HEADER_TYPE", "Bearer")
+    prefix = f"{header_type} " if header_type else ""
+    if not header or not header.startswith(prefix):
+        return None
+    return header[len(prefix):].strip() or None
+
+def _bearer_token():
+    """
+    Returns the raw JWT from the request's auth header, or None.
+    """
+    header = request.headers.get(current_app.config.get("JWT_HEADER_NAME", "Authorization"), "")
+    return token_from_header(current_app.config, header)
+
+def _verified_claims():
+    """
+    Returns the claims of the request's JWT, verifying the signature
+    only when the token is not already in the claims cache.
+    """
+    token = _bearer_token()
+    if token and Config.JWT_CLAIMS_CACHE_ENABLED:
+        claims = claims_cache.get(token)
+        if claims is not None:
+            _check_scope(claims)
+            return claims
+
+    # Verifies JWT is present, valid, and not expired
+    verify_jwt_in_request()
+    claims = get_jwt()
+    _check_scope(claims)
+
+    if token and Config.JWT_CLAIMS_CACHE_ENABLED:
+        claims_cache.put(token, claims)
+    return claims
+
+def verified_token_claims(app, token, scope=None):
+    """
+    Verifies a raw access token outside of the Authorization header (e.g.
+    in the asyncio ingest app, or a stream token from the query string),
+    with the app's JWT settings and the same claims cache as the admin
+    routes. The token's `scope` claim must equal `scope`.
+
+    Raises:
+        jwt.InvalidTokenError or flask_jwt_extended's JWTExtendedException
+        if the token is invalid, expired, not an access token or has
+        another scope.
+    """
+    if Config.JWT_CLAIMS_CACHE_ENABLED:
+        claims = claims_cache.get(token)
+        if claims is not None:
+            _check_scope(claims, scope)
+            return claims
+
+    with app.app_context():
+        claims = decode_token(token)
+    if claims.get("type") != "access":
+        raise WrongTokenError("Only non-refresh tokens are allowed")
+    _check_scope(claims, scope)
+
+    if Config.JWT_CLAIMS_CACHE_ENABLED:
+        claims_cache.put(token, claims)
+    return claims
+
+def admin_required(stream_token: bool = False):
     """
     A custom decorator that verifies the JWT is present and confirms
-    the user's role is 'admin'.
+    the user's role is 'admin'. The verified claims are available to
+    the route as `g.jwt_claims`.
+
+    With `stream_token`, a stream token in the `token` query parameter
+    is accepted in place of the Authorization header.
     """
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
             try:
-                # Verifies JWT is present, valid, and not expired
-                verify_jwt_in_request()
-                claims = get_jwt()
-                
-                # Check if the role claim is 'admin'
-                if claims.get("role") != "admin":
-                    return jsonify({"error": "Access forbidden: Admin role required."}), 403
+                query_token = request.args.get("token") if stream_token else None
+                if query_token and not _bearer_token():
+                    claims = verified_token_claims(current_app._get_current_object(), query_token, scope=STREAM_TOKEN_SCOPE)
                 else:
-                    # Proceed to the protected function
-                    return fn(*args, **kwargs)
-            
+                    claims = _verified_claims()
             except Exception as e:
                 # Handle cases like missing token, expired token, etc.
                 return jsonify({"error": f"Authentication error: {str(e)}"}), 401
+
+            # Check if the role claim is 'admin'
+            if claims.get("role") != "admin":
+                return jsonify({"error": "Access forbidden: Admin role required."}), 403
+
+            g.jwt_claims = claims
+            # Proceed to the protected function
+            return fn(*args, **kwargs)
                 
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,140 @@
+import logging
+from config import Config
+from services.config_store import runtime_config
+
+log = logging.getLogger(__name__)
+
+# Framework-neutral checks for a feedback submission, shared by the Flask
+# route (api/feedback_routes.py) and the asyncio ingest app (ingest_app.py).
+# Responses are (status, JSON body, headers) tuples for the caller to send.
+
+ACCEPTED_MESSAGE = "Feedback successfully queued for processing"
+
+
+class Submission:
+    """
+    Outcome of the checks on one feedback submission.
+
+    Either `response` is set and the submission must not be queued, or
+    `job` is ready for the queue and `accepted()` is the answer once it
+    is queued. In the latter case the idempotency key (if any) is already
+    claimed; call `release()` if queueing fails so a retry is accepted.
+    """
+    __slots__ = ("job", "response", "headers", "_idempotency_index")
+
+    def __init__(self, job: dict = None, response: tuple = None, headers: dict = None, idempotency_index=None):
+        self.job = job
+        self.response = response
+        self.headers = headers or {}
+        self._idempotency_index = idempotency_index
+
+    def accepted(self) -> tuple:
+        # 202 Accepted: the request has been accepted for processing,
+        # but the processing is not yet complete.
+        return 202, {"message": ACCEPTED_MESSAGE}, self.headers
+
+    def release(self):
+        if self._idempotency_index is not None and self.job and self.job.get("idempotency_key"):
+            self._idempotency_index.discard(self.job["idempotency_key"])
+
+
+def check_rate_limit(limiter, user_id, entity_type, remote_addr=None):
+    """
+    Applies the per-identity (and optionally per-IP) token buckets.
+    Returns the most restrictive RateLimitResult, or None if limiting is off.
+    """
+    config = runtime_config()
+    if not limiter or not config.RATE_LIMIT_ENABLED:
+        return None
+
+    limits = config.RATE_LIMITS.get(entity_type) or config.RATE_LIMITS["default"]
+    keys = [("user", user_id, entity_type)]
+    if config.RATE_LIMIT_BY_IP and remote_addr:
+        keys.append(("ip", remote_addr, entity_type))
+
+    # Both buckets are charged, or neither
+    return limiter.check_all(keys, limits["rate_per_minute"], limits["burst"])
+
+
+def idempotency_key(user_id, data, header=None):
+    """
+    Returns the submission's idempotency key scoped to the user
+    ("<user_id>:<key>"), taken from the Idempotency-Key header or the
+    client-supplied `feedback_id`, or None if the client sent neither.
+    Raises ValueError if the key is unusable.
+    """
+    key = header or data.get('feedback_id')
+    if key is None:
+        return None
+    key = str(key).strip()
+    if not key or len(key) > Config.IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValueError(f"Idempotency key must be 1-{Config.IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+    return f"{user_id}:{key}"
+
+
+def replayed_response() -> tuple:
+    """
+    The response for a repeated submission: the original 202, marked as a replay.
+    """
+    return 202, {"message": ACCEPTED_MESSAGE}, {"Idempotent-Replayed": "true"}
+
+
+def prepare_submission(user_id, data, rate_limiter=None, idempotency_index=None,
+                       idempotency_header=None, remote_addr=None) -> Submission:
+    """
+    Validates a submission from an authenticated user and applies the
+    feature flags, idempotency and rate limits, in that order.
+    """
+    if not isinstance(data, dict):
+        return Submission(response=(400, {"error": "Request body must be a JSON object."}, {}))
+
+    # --- Extract data from request body ---
+    entity_type = data.get('entity_type')
+    entity_id = data.get('entity_id')
+    text = data.get('text')
+
+    # Basic validation
+    if not all([entity_type, entity_id, text]):
+        log.warning("Feedback submission failed validation: Missing fields")
+        return Submission(response=(400, {"error": "Missing fields. 'entity_type', 'entity_id', and 'text' are required."}, {}))
+
+    # --- Feature Flag Check ---
+    # Check if this feedback type is enabled in the config
+    feature_flags = runtime_config().FEATURE_FLAGS
+    if entity_type not in feature_flags or not feature_flags[entity_type]:
+        log.warning("Feedback submission rejected: Feature flag for '%s' is disabled.", entity_type)
+        return Submission(response=(400, {"error": f"Feedback for entity type '{entity_type}' is currently disabled"}, {}))
+
+    # --- Idempotency Check ---
+    # A retry of an accepted submission gets the original answer without
+    # being queued again (or spending a rate-limit token)
+    try:
+        key = idempotency_key(user_id, data, idempotency_header)
+    except ValueError as e:
+        return Submission(response=(400, {"error": str(e)}, {}))
+    if key and idempotency_index is not None and idempotency_index.contains(key):
+        log.info("Replayed idempotent feedback submission from user %s", user_id)
+        return Submission(response=replayed_response())
+
+    # --- Rate Limit Check ---
+    rate_limit = check_rate_limit(rate_limiter, user_id, entity_type, remote_addr)
+    if rate_limit is not None and not rate_limit.allowed:
+        log.info("Feedback submission rate-limited for user %s (%s)", user_id, entity_type)
+        return Submission(response=(429, {"error": "Too many feedback submissions, please slow down"}, rate_limit.headers()))
+
+    # Claim the key before queueing so two concurrent retries
+    # cannot both be accepted
+    if key and idempotency_index is not None and not idempotency_index.add(key):
+        return Submission(response=replayed_response())
+
+    # --- Construct the Job Payload ---
+    # The user_id comes from the verified token, never the request body
+    job = {
+        "user_id": user_id,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "text": text,
+        "idempotency_key": key
+    }
+    headers = rate_limit.headers() if rate_limit is not None else {}
+    return Submission(job=job, headers=headers, idempotency_index=idempotency_index if key else None)
@@ -1,14 +1,18 @@
 import logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from config import Config
+from api.feedback_intake import prepare_submission
 
 log = logging.getLogger(__name__)
 
 # Create a Blueprint
-# The 'queue_service' will be injected from app.py
+# The 'queue_service', 'rate_limiter' and 'idempotency_index' will be injected from app.py
 feedback_bp = Blueprint('feedback_api', __name__)
 
+
+def _respond(status, body, headers):
+    return jsonify(body), status, headers
+
 @feedback_bp.route('', methods=['POST'])
 @jwt_required() # <-- Add this decorator to protect the route
 def submit_feedback():
@@ -27,46 +31,36 @@ def submit_feedback():
         log.warning(f"Error getting JWT identity: {e}")
         return jsonify({"error": "Invalid authentication token"}), 401
     
-    # --- Extract data from request body ---
-    entity_type = data.get('entity_type')
-    entity_id = data.get('entity_id')
-    text = data.get('text')
-
-    # Basic validation
-    if not all([entity_type, entity_id, text]):
-        log.warning("Feedback submission failed validation: Missing fields")
-        return jsonify({"error": "Missing fields. 'entity_type', 'entity_id', and 'text' are required."}), 400
-
-    # --- Feature Flag Check ---
-    # Check if this feedback type is enabled in the config
-    if entity_type not in Config.FEATURE_FLAGS or not Config.FEATURE_FLAGS[entity_type]:
-        log.warning(f"Feedback submission rejected: Feature flag for '{entity_type}' is disabled.")
-        return jsonify({"error": f"Feedback for entity type '{entity_type}' is currently disabled"}), 400
-
-    # --- Construct the Job Payload ---
-    # We now include the authenticated user_id
-    feedback_job_data = {
-        "user_id": current_user_id, # <-- Use the ID from the token
-        "entity_type": entity_type,
-        "entity_id": entity_id,
-        "text": text
-    }
+    # --- Validation, feature flags, idempotency and rate limits ---
+    # Shared with the asyncio ingest app (see api/feedback_intake.py)
+    submission = prepare_submission(
+        current_user_id, data,
+        rate_limiter=getattr(feedback_bp, 'rate_limiter', None),
+        idempotency_index=getattr(feedback_bp, 'idempotency_index', None),
+        idempotency_header=request.headers.get('Idempotency-Key'),
+        remote_addr=request.remote_addr
+    )
+    if submission.response is not None:
+        return _respond(*submission.response)
 
     try:
         # Access the queue service injected during app creation
         queue = getattr(feedback_bp, 'queue_service', None)
         if not queue:
+            submission.release()
             log.error("Queue service is not initialized on feedback_bp.")
             return jsonify({"error": "Internal server error: Queue not available"}), 500
-            
+
         # Put the job on the queue for the background worker
-        queue.put(feedback_job_data)
-        
-        log.info(f"Queued feedback for {entity_type}:{entity_id} from user {current_user_id}")
+        try:
+            queue.put(submission.job)
+        except Exception:
+            submission.release()
+            raise
         
-        # Return 202 Accepted: The request has been accepted for processing,
-        # but the processing is not yet complete.
-        return jsonify({"message": "Feedback successfully queued for processing"}), 202
+        job = submission.job
+        log.info("Queued feedback for %s:%s from user %s", job["entity_type"], job["entity_id"], current_user_id)
+        return _respond(*submission.accepted())
 
     except Exception as e:
         log.error(f"Failed to queue feedback: {e}", exc_info=True)
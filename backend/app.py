@@ -13,13 +13,23 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import Config
 from database import init_db, db_session
 from services.feedback_processor import FeedbackProcessor
-from services.queue_service import InMemoryQueue
+from services.queue_service import PriorityLaneQueue
 from services.sentiment_service import SimpleSentimentService
+from services.sentiment_cache import CachedSentimentService
 from services.scoring_service import ScoringService
 from services.alerting_service import AlertingService
+from services.alert_dispatcher import AlertDispatcher
+from services.distribution_service import ScoreDistributionService
+from services.event_broadcaster import EventBroadcaster
+from services.rate_limiter import TokenBucketLimiter
+from services.idempotency_service import IdempotencyIndex
+from services.dedup_service import NearDuplicateDetector
+from services.password_hasher import PasswordHasher
+from services.config_store import ConfigStore
+from api.decorator import STREAM_TOKEN_SCOPE
+from logging_config import setup_logging
  
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+setup_logging()
 log = logging.getLogger(__name__)
 
 
@@ -32,11 +42,18 @@ def create_app():
 
     
     log.info("Initializing services...")
-    queue_service = InMemoryQueue()
+    queue_service = PriorityLaneQueue(lane_weights=Config.QUEUE_LANE_WEIGHTS)
     sentiment_service = SimpleSentimentService()
+    sentiment_cache = None
+    if Config.SENTIMENT_CACHE_ENABLED:
+        sentiment_cache = CachedSentimentService(sentiment_service)
+        sentiment_service = sentiment_cache
     scoring_service = ScoringService()
     alerting_service = AlertingService()
+    event_broadcaster = EventBroadcaster()
+    dedup_service = NearDuplicateDetector()
     db_session_factory = db_session
+    alert_dispatcher = AlertDispatcher(db_session_factory=db_session_factory)
 
     
     processor = FeedbackProcessor(
@@ -44,19 +61,46 @@ def create_app():
         queue_service=queue_service,
         sentiment_service=sentiment_service,
         scoring_service=scoring_service,
-        alerting_service=alerting_service
+        alerting_service=alerting_service,
+        event_broadcaster=event_broadcaster,
+        dedup_service=dedup_service,
+        alert_dispatcher=alert_dispatcher
     )
     processor.start_worker_thread()
     log.info("Background feedback processing worker started.")
 
+    distribution_service = ScoreDistributionService(db_session_factory=db_session_factory)
+
     
     jwt = JWTManager(app)
+
+    # Stream tokens travel in URLs, so they only open the admin event
+    # stream (see api/decorator.py); no header-authenticated route takes them
+    @jwt.token_verification_loader
+    def reject_stream_tokens(jwt_header, jwt_data):
+        return jwt_data.get("scope") != STREAM_TOKEN_SCOPE
+
     log.info("JWTManager initialized.")
 
     
     with app.app_context():
         init_db()
 
+    # Adopt the shared, versioned runtime config before serving anything
+    config_store = ConfigStore(db_session_factory=db_session_factory)
+    config_store.load()
+    config_store.install()
+    config_store.start_poll_thread()
+    log.info("Runtime config version %d loaded.", config_store.current().version)
+
+    # Needs the tables to exist before its first refresh
+    distribution_service.start_refresh_thread()
+    log.info("Fleet score distribution refresher started.")
+
+    if alert_dispatcher.sinks:
+        alert_dispatcher.start_dispatch_thread()
+        log.info("Alert dispatcher started for %d webhook sink(s).", len(alert_dispatcher.sinks))
+
     
     log.info("Registering API blueprints...")
 
@@ -66,6 +110,18 @@ def create_app():
     from backend.api.auth_routes import auth_bp
 
     feedback_bp.queue_service = queue_service
+    feedback_bp.rate_limiter = TokenBucketLimiter()
+    feedback_bp.idempotency_index = IdempotencyIndex()
+    password_hasher = PasswordHasher()
+    auth_bp.password_hasher = password_hasher
+    admin_bp.distribution_service = distribution_service
+    admin_bp.queue_service = queue_service
+    admin_bp.event_broadcaster = event_broadcaster
+    admin_bp.dedup_service = dedup_service
+    admin_bp.config_store = config_store
+    admin_bp.alert_dispatcher = alert_dispatcher
+    admin_bp.sentiment_cache = sentiment_cache
+    admin_bp.scoring_service = scoring_service
 
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(feedback_bp, url_prefix="/api/feedback")
@@ -92,6 +148,12 @@ def create_app():
     def shutdown_worker():
         log.info("Shutting down feedback worker...")
         processor.stop_worker()
+        distribution_service.stop_refresher()
+        password_hasher.shutdown()
+        config_store.stop_poller()
+        alert_dispatcher.stop_dispatcher()
+        if sentiment_cache:
+            sentiment_cache.close()
 
     return app
 
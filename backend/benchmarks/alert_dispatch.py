@@ -0,0 +1,170 @@
+"""
+Alert dispatcher check against local stub webhook servers.
+
+Seeds a throwaway SQLite outbox with alerts for a set of drivers, starts
+one stub HTTP/1.1 keep-alive server per sink (optionally failing a share
+of requests with 503), runs the AlertDispatcher until the outbox drains
+and reports:
+- throughput, requests and connections opened per sink,
+- how many alerts were coalesced into each notification, and
+- whether every alert reached every sink exactly once.
+
+Usage (from the repository root):
+    python backend/benchmarks/alert_dispatch.py --alerts 5000 --drivers 200 --sinks 2 --fail-rate 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import Config
+
+# Must be set before `database` creates its engine
+_db_dir = tempfile.mkdtemp(prefix="alert_bench_")
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(_db_dir, 'bench.db')
+
+from database import init_db, db_session
+from models.alert import AlertLog, AlertOutbox, AlertRule, OutboxStatus
+from services.alert_dispatcher import AlertDispatcher
+
+
+class StubWebhookServer(ThreadingHTTPServer):
+    """
+    Records every notification POSTed to it. A `fail_rate` share of
+    requests is answered with 503 before anything is recorded.
+    """
+    daemon_threads = True
+
+    def __init__(self, fail_rate=0.0, delay=0.0):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.client_ports = set()
+        self.notifications = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/alerts"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        if server.delay:
+            time.sleep(server.delay)
+        with server.lock:
+            server.requests += 1
+            server.client_ports.add(self.client_address[1])
+            failed = random.random() < server.fail_rate
+            if failed:
+                server.failures += 1
+            else:
+                server.notifications.extend(json.loads(body)["notifications"])
+        self.send_response(503 if failed else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def seed_outbox(alert_count, driver_count, sink_names):
+    db = db_session()
+    try:
+        for i in range(alert_count):
+            driver_id = f"bench-driver-{i % driver_count}"
+            alert = AlertLog(driver_id=driver_id, rule=AlertRule.EMA_THRESHOLD.value,
+                             score_at_alert=2.0, threshold_at_alert=2.5)
+            db.add(alert)
+            payload = json.dumps({"rule": AlertRule.EMA_THRESHOLD.value, "value": 2.0, "threshold": 2.5, "seq": i})
+            for name in sink_names:
+                db.add(AlertOutbox(alert=alert, driver_id=driver_id, sink=name, payload=payload))
+        db.commit()
+    finally:
+        db.close()
+
+
+def outbox_counts():
+    db = db_session()
+    try:
+        return Counter(status for (status,) in db.query(AlertOutbox.status))
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--drivers", type=int, default=200)
+    parser.add_argument("--sinks", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--fail-rate", type=float, default=0.2)
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Fast retries so the run finishes quickly
+    Config.ALERT_RETRY_BASE_SECONDS = 0.05
+    Config.ALERT_RETRY_MAX_SECONDS = 0.5
+    Config.ALERT_DISPATCH_MAX_ATTEMPTS = 50
+
+    servers = {}
+    for n in range(args.sinks):
+        server = StubWebhookServer(fail_rate=args.fail_rate, delay=args.delay_ms / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[f"sink-{n}"] = server
+    Config.ALERT_WEBHOOK_SINKS = [
+        {"name": name, "url": server.url, "concurrency": args.concurrency, "batch_size": args.batch_size}
+        for name, server in servers.items()
+    ]
+
+    init_db()
+    seed_outbox(args.alerts, args.drivers, list(servers))
+
+    dispatcher = AlertDispatcher(db_session_factory=db_session)
+    start = time.perf_counter()
+    while outbox_counts()[OutboxStatus.PENDING.value]:
+        if not dispatcher.dispatch_once():
+            # Everything left is backing off
+            time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    dispatcher.stop_dispatcher()
+
+    stats = dispatcher.stats()
+    print(f"Delivered {stats['alerts_sent']} outbox rows in {elapsed:.2f}s "
+          f"({stats['alerts_sent'] / elapsed:.0f} alerts/s) as {stats['notifications_sent']} notifications")
+    print(f"  requests: {stats['requests_sent']} ok, {stats['requests_failed']} failed; "
+          f"retried {stats['alerts_retried']} alert(s), gave up on {stats['alerts_failed']}")
+    print(f"  outbox: {stats['outbox']}")
+
+    ok = True
+    for name, server in servers.items():
+        received = Counter(alert["seq"] for n in server.notifications for alert in n["alerts"])
+        sizes = [n["count"] for n in server.notifications]
+        exactly_once = len(received) == args.alerts and set(received.values()) == {1}
+        ok = ok and exactly_once
+        print(f"{name}: {server.requests} requests ({server.failures} failed) over "
+              f"{len(server.client_ports)} connection(s); {len(sizes)} notifications, "
+              f"{sum(sizes) / max(len(sizes), 1):.1f} alerts each; every alert exactly once: {exactly_once}")
+        server.shutdown()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Login and admin-poll load benchmark.
+
+Runs the real Flask app against a throwaway SQLite database and reports
+throughput, latency percentiles and status codes for:
+- a burst of concurrent logins (bcrypt on the bounded hasher pool), and
+- repeated admin dashboard polls with the verified-claims cache off and on.
+
+Usage (from the repository root):
+    python backend/benchmarks/auth_load.py --logins 200 --polls 5000 --concurrency 32
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+from config import Config
+
+# Must be set before `database` creates its engine
+_db_dir = tempfile.mkdtemp(prefix="auth_bench_")
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(_db_dir, 'bench.db')
+Config.SCORE_SNAPSHOT_PATH = None
+
+from app import create_app
+
+
+def run_load(app, total, concurrency, make_request):
+    """
+    Fires `total` requests from `concurrency` threads, each with its own client.
+    Returns (elapsed_seconds, latencies, status_counts).
+    """
+    def worker(count):
+        client = app.test_client()
+        results = []
+        for _ in range(count):
+            start = time.perf_counter()
+            status = make_request(client)
+            results.append((time.perf_counter() - start, status))
+        return results
+
+    shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [r for chunk in pool.map(worker, shares) for r in chunk]
+    elapsed = time.perf_counter() - start
+
+    return elapsed, [r[0] for r in results], Counter(r[1] for r in results)
+
+
+def report(label, elapsed, latencies, statuses):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{label}:")
+    print(f"  {len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} req/s)")
+    print(f"  latency ms: mean={statistics.mean(latencies) * 1000:.1f} p50={p(0.5):.1f} p95={p(0.95):.1f} p99={p(0.99):.1f}")
+    print(f"  status codes: {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+
+    credentials = {"username": "bench-admin", "password": "bench-password"}
+    client.post("/api/auth/register", json={**credentials, "role": "admin"})
+    token = client.post("/api/auth/login", json=credentials).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    elapsed, latencies, statuses = run_load(
+        app, args.logins, args.concurrency,
+        lambda c: c.post("/api/auth/login", json=credentials).status_code
+    )
+    report(f"Login burst ({args.concurrency} concurrent)", elapsed, latencies, statuses)
+
+    for cache_enabled in (False, True):
+        Config.JWT_CLAIMS_CACHE_ENABLED = cache_enabled
+        elapsed, latencies, statuses = run_load(
+            app, args.polls, args.concurrency,
+            lambda c: c.get("/api/admin/config", headers=headers).status_code
+        )
+        report(f"Admin poll, claims cache {'on' if cache_enabled else 'off'}", elapsed, latencies, statuses)
+
+
+if __name__ == "__main__":
+    main()
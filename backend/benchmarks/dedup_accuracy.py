@@ -0,0 +1,103 @@
+"""
+Near-duplicate detection accuracy check.
+
+Signatures depend on Python's per-process string hash, so each round
+runs in a child process with a different PYTHONHASHSEED. Every round
+checks that:
+- one-word edits of short texts ("driver was rude" / "driver was
+  polite") are never collapsed: they are real, often opposite, feedback;
+- genuine near-duplicates (case, punctuation or one extra word in a
+  long text) are collapsed;
+- the same text about another entity is never collapsed.
+
+Exits non-zero if any round collapses a distinct text, so it can be
+used as a regression check.
+
+Usage (from the repository root):
+    python backend/benchmarks/dedup_accuracy.py --seeds 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pairs that must stay separate
+DISTINCT = [
+    ("driver was rude", "driver was polite"),
+    ("car was dirty", "car was clean"),
+    ("trip was great", "trip was awful"),
+    ("music too loud", "music too quiet"),
+    ("the driver was very rude today", "the driver was very kind today"),
+    ("great driver", "great car"),
+    ("pickup was on time and the car smelled fresh", "pickup was late and the car smelled fresh"),
+]
+
+# Pairs that must be collapsed
+DUPLICATES = [
+    ("Driver was rude!!", "driver was rude"),
+    ("The driver was rude and drove way too fast on the highway",
+     "the driver was rude and drove way too fast on the highway again"),
+    ("Worst trip ever, the car was dirty and the driver was on the phone",
+     "worst trip ever the car was dirty and the driver was on the phone!!!"),
+]
+
+
+def run_round():
+    sys.path.insert(0, BACKEND_DIR)
+    from services.dedup_service import NearDuplicateDetector
+
+    def collapsed(first, second, second_entity="D1"):
+        detector = NearDuplicateDetector()
+        detector.check(1, "DRIVER", "D1", first).bind(object())
+        return detector.check(2, "DRIVER", second_entity, second).duplicate_of is not None
+
+    # Same user for the pairs, so the per-user scope (any length) is exercised
+    def collapsed_same_user(first, second):
+        detector = NearDuplicateDetector()
+        detector.check(1, "DRIVER", "D1", first).bind(object())
+        return detector.check(1, "DRIVER", "D1", second).duplicate_of is not None
+
+    print(json.dumps({
+        "false_collapses": [pair for pair in DISTINCT if collapsed_same_user(*pair) or collapsed(*pair)],
+        "missed": [pair for pair in DUPLICATES if not collapsed_same_user(*pair)],
+        "cross_entity": [pair[0] for pair in DUPLICATES if collapsed(pair[0], pair[0], second_entity="D2")],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, default=20, help="hash seeds (child processes) to try")
+    parser.add_argument("--round", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.round:
+        run_round()
+        return
+
+    false_collapses = missed = cross_entity = 0
+    for seed in range(1, args.seeds + 1):
+        env = dict(os.environ, PYTHONHASHSEED=str(seed))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--round"],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        for pair in result["false_collapses"]:
+            print(f"seed {seed}: collapsed distinct texts {pair}")
+        false_collapses += len(result["false_collapses"])
+        missed += len(result["missed"])
+        cross_entity += len(result["cross_entity"])
+
+    rounds = args.seeds
+    print(f"{rounds} seeds:")
+    print(f"  distinct pairs collapsed:  {false_collapses}/{rounds * len(DISTINCT)}")
+    print(f"  duplicates missed:         {missed}/{rounds * len(DUPLICATES)}")
+    print(f"  collapsed across entities: {cross_entity}/{rounds * len(DUPLICATES)}")
+    sys.exit(1 if false_collapses or cross_entity else 0)
+
+
+if __name__ == "__main__":
+    main()
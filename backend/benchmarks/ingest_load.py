@@ -0,0 +1,279 @@
+"""
+Feedback ingest benchmark: Flask route vs. the asyncio ingest app.
+
+Starts each front end in its own process on a throwaway SQLite database
+(the Flask app on werkzeug's threaded server, as `app.py` runs it; the
+ingest app on uvicorn), opens `--connections` connections to it, holds
+them all open, and has each send `--requests` feedback submissions with
+a random think time between them (slow mobile clients). Werkzeug closes
+the connection after every response, so the Flask client reconnects.
+Reports per front end:
+- connections established, reconnects and responses by status code,
+- throughput and latency percentiles,
+- server CPU time per request (includes the feedback worker), and
+- the server's thread count and memory with every connection open.
+
+Rate limiting is disabled so every valid request is queued. The feedback
+worker is not started unless `--with-worker` is given, so the numbers
+measure the front ends alone (queued jobs just accumulate in memory).
+
+Usage (from the repository root; needs uvicorn, and `ulimit -n` above
+the connection count):
+    python backend/benchmarks/ingest_load.py --connections 10000 --requests 3 --think-ms 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def raise_open_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+# --- Server side (runs in a child process) ---
+
+def serve(target, port, with_worker):
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+    from config import Config
+
+    # Must be set before `database` creates its engine
+    db_dir = tempfile.mkdtemp(prefix="ingest_bench_")
+    Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'bench.db')
+    Config.SCORE_SNAPSHOT_PATH = None
+    Config.RATE_LIMIT_ENABLED = False
+    Config.LOG_LEVEL = "WARNING"
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    warnings.simplefilter("ignore")
+    raise_open_file_limit()
+
+    if not with_worker:
+        from services.feedback_processor import FeedbackProcessor
+        FeedbackProcessor.start_worker_thread = lambda self: None
+
+    from app import create_app
+    flask_app = create_app()
+
+    client = flask_app.test_client()
+    credentials = {"username": "bench-user", "password": "bench-password"}
+    client.post("/api/auth/register", json=credentials)
+    token = client.post("/api/auth/login", json=credentials).get_json()["access_token"]
+    print(f"TOKEN {token}", flush=True)
+
+    if target == "flask":
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"
+        server = make_server("127.0.0.1", port, flask_app, threaded=True, request_handler=WSGIRequestHandler)
+        # Same accept backlog as uvicorn gets below
+        server.socket.listen(4096)
+        server.serve_forever()
+    else:
+        import uvicorn
+        from ingest_app import create_ingest_app
+        uvicorn.run(create_ingest_app(flask_app), host="127.0.0.1", port=port, backlog=4096,
+                    timeout_keep_alive=300, log_level="warning")
+
+
+def server_usage(pid):
+    """
+    Returns (threads, resident MB) of a process, from /proc (Linux only).
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Threads"]), int(fields["VmRSS"].split()[0]) // 1024
+    except (OSError, KeyError):
+        return None, None
+
+
+def server_cpu_seconds(pid):
+    """
+    Returns the user + system CPU time a process has used, from /proc (Linux only).
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+# --- Client side ---
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.connected = 0
+        self.reconnects = 0
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Server closed the connection")
+    status = int(status_line.split()[1])
+    length = 0
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value.strip().lower() == "close":
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def client_connection(n, args, token, results, all_connected, connect_slots):
+    def request_bytes(i):
+        body = json.dumps({
+            "entity_type": "DRIVER",
+            "entity_id": f"bench-driver-{(n + i) % 500}",
+            "text": f"driver {n} trip {i} was great and friendly"
+        }).encode()
+        head = (f"POST /api/feedback HTTP/1.1\r\nHost: 127.0.0.1:{args.port}\r\n"
+                f"Authorization: Bearer {token}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n")
+        return head.encode() + body
+
+    try:
+        async with connect_slots:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", args.port), 30)
+    except Exception as e:
+        results.errors[f"connect: {type(e).__name__}"] += 1
+        return
+    results.connected += 1
+
+    try:
+        # Hold every connection open before any traffic starts
+        await all_connected.wait()
+        for i in range(args.requests):
+            await asyncio.sleep(random.uniform(0, args.think_ms / 1000))
+            start = time.perf_counter()
+            writer.write(request_bytes(i))
+            await writer.drain()
+            status, keep_alive = await asyncio.wait_for(read_response(reader), 60)
+            results.latencies.append(time.perf_counter() - start)
+            results.statuses[status] += 1
+            if not keep_alive and i + 1 < args.requests:
+                writer.close()
+                reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", args.port), 30)
+                results.reconnects += 1
+    except Exception as e:
+        results.errors[f"request: {type(e).__name__}"] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(args, token, server_pid):
+    results = Results()
+    all_connected = asyncio.Event()
+    connect_slots = asyncio.Semaphore(args.connect_concurrency)
+    tasks = [
+        asyncio.create_task(client_connection(n, args, token, results, all_connected, connect_slots))
+        for n in range(args.connections)
+    ]
+
+    connect_start = time.perf_counter()
+    while results.connected + sum(v for k, v in results.errors.items() if k.startswith("connect")) < args.connections:
+        await asyncio.sleep(0.1)
+    connect_seconds = time.perf_counter() - connect_start
+    # Give the server a moment to accept everything, then sample it
+    await asyncio.sleep(1)
+    threads, rss_mb = server_usage(server_pid)
+    cpu_start = server_cpu_seconds(server_pid)
+
+    start = time.perf_counter()
+    all_connected.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    cpu_end = server_cpu_seconds(server_pid)
+    cpu_seconds = cpu_end - cpu_start if cpu_start is not None and cpu_end is not None else None
+    return results, connect_seconds, elapsed, threads, rss_mb, cpu_seconds
+
+
+def report(label, results, connect_seconds, elapsed, threads, rss_mb, cpu_seconds):
+    latencies = sorted(results.latencies) or [0.0]
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{label}:")
+    print(f"  connections: {results.connected} open in {connect_seconds:.1f}s; "
+          f"server threads={threads} rss={rss_mb}MB")
+    print(f"  {len(results.latencies)} responses in {elapsed:.1f}s ({len(results.latencies) / elapsed:.0f} req/s)")
+    if cpu_seconds is not None and results.latencies:
+        print(f"  server CPU: {cpu_seconds:.1f}s ({cpu_seconds / len(results.latencies) * 1000:.2f} ms/request)")
+    print(f"  latency ms: mean={statistics.mean(latencies) * 1000:.1f} p50={p(0.5):.1f} p95={p(0.95):.1f} p99={p(0.99):.1f}")
+    print(f"  status codes: {dict(results.statuses)}  reconnects: {results.reconnects}  errors: {dict(results.errors)}")
+
+
+def bench(target, args):
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    command = [sys.executable, os.path.abspath(__file__), "--serve", target, "--port", str(args.port)]
+    if args.with_worker:
+        command.append("--with-worker")
+    server = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE, text=True, env=env
+    )
+    try:
+        token = None
+        for line in server.stdout:
+            if line.startswith("TOKEN "):
+                token = line.split()[1]
+                break
+        if token is None:
+            raise RuntimeError(f"{target} server did not start")
+        time.sleep(1)
+
+        results = asyncio.run(run_load(args, token, server.pid))
+        report(f"{target} ({args.connections} connections x {args.requests} requests)", *results)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default="flask,asgi", help="comma-separated: flask, asgi")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=3, help="requests per connection")
+    parser.add_argument("--think-ms", type=float, default=1000, help="max random pause before each request")
+    parser.add_argument("--connect-concurrency", type=int, default=500)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--with-worker", action="store_true", help="also run the feedback worker in the server")
+    parser.add_argument("--serve", choices=["flask", "asgi"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.with_worker)
+        return
+
+    limit = raise_open_file_limit()
+    if limit < args.connections + 100:
+        print(f"warning: open-file limit {limit} is below the connection count")
+    for target in args.targets.split(","):
+        bench(target.strip(), args)
+
+
+if __name__ == "__main__":
+    main()
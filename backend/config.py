@@ -16,6 +16,20 @@ class Config:
     # You can generate one using: python -c "import secrets; print(secrets.token_hex(32))"
     JWT_SECRET_KEY = "CHANGE-THIS-IN-PRODUCTION-a-super-secret-key"
 
+    # Verified admin token claims are cached (keyed by a token digest) so
+    # repeated dashboard calls skip signature verification. Entries never
+    # outlive the token's own `exp`.
+    JWT_CLAIMS_CACHE_ENABLED = True
+    JWT_CLAIMS_CACHE_TTL_SECONDS = 60
+    JWT_CLAIMS_CACHE_SIZE = 10000
+
+    # --- Password Hashing ---
+    # bcrypt runs on a bounded pool: BCRYPT_MAX_WORKERS at once, up to
+    # BCRYPT_MAX_PENDING waiting; callers get a 503 after the timeout.
+    BCRYPT_MAX_WORKERS = 4
+    BCRYPT_MAX_PENDING = 32
+    BCRYPT_TIMEOUT_SECONDS = 5
+
     # --- Business Logic Configuration ---
     
     # Alert threshold (e.g., 2.5 out of 5)
@@ -27,6 +41,203 @@ class Config:
     # Alert throttling
     ALERT_THROTTLE_MINUTES = 60
 
+    # --- Negative-Rate Alerting ---
+    # Fires when the share of negative feedback in a driver's recent
+    # window reaches the threshold, without waiting for the EMA to drop.
+
+    NEGATIVE_RATE_ALERT_ENABLED = True
+
+    # Share of negative feedback (0.0 - 1.0) that raises an alert.
+    NEGATIVE_RATE_THRESHOLD = 0.6
+
+    # Window covers the last N feedbacks...
+    NEGATIVE_RATE_WINDOW_SIZE = 10
+
+    # ...or, if set to a positive number, the last T minutes instead.
+    NEGATIVE_RATE_WINDOW_MINUTES = 0
+
+    # Minimum feedbacks in the window before the rule can fire.
+    NEGATIVE_RATE_MIN_SAMPLES = 5
+
+    # Upper bound on in-memory windows across the fleet.
+    NEGATIVE_RATE_MAX_TRACKED_DRIVERS = 100000
+
+    # --- Feedback Processing ---
+
+    # Relative share of worker throughput each entity type's queue lane
+    # gets while several lanes are backlogged. Unknown types use weight 1.
+    QUEUE_LANE_WEIGHTS = {
+        "DRIVER": 8,
+        "TRIP": 2,
+        "APP": 1,
+        "MARSHAL": 1
+    }
+
+    # Max number of queued messages the worker processes in one transaction.
+    PROCESSOR_BATCH_SIZE = 50
+
+    # --- Entity Aggregation ---
+
+    # Number of most recent scores used by the windowed-mean aggregator.
+    AGGREGATION_WINDOW_SIZE = 20
+
+    # Scores at or below this value count as negative feedback.
+    NEGATIVE_SCORE_THRESHOLD = 2.0
+
+    # --- Runtime Config Versions ---
+    # Settings editable through /api/admin/config (see RUNTIME_KEYS in
+    # services/config_store.py) are stored as versioned snapshots in the
+    # database; the values in this class only seed the first version.
+    # Each process polls for a newer version this often.
+    CONFIG_POLL_SECONDS = 5
+
+    # Processes that have not polled for this long are dropped from the
+    # worker list shown by GET /api/admin/config.
+    CONFIG_WORKER_RETENTION_HOURS = 24
+
+    # --- Fleet Score Distribution ---
+
+    # How often the in-memory fleet score snapshot is rebuilt.
+    SCORE_SNAPSHOT_REFRESH_SECONDS = 300
+
+    # Optional file the snapshot is persisted to (memory-mapped on load).
+    # Set to None to keep the snapshot in memory only.
+    SCORE_SNAPSHOT_PATH = os.path.join(basedir, 'score_snapshot.bin')
+
+    # Drivers below this percentile rank are flagged as "bottom of fleet".
+    FLEET_BOTTOM_PERCENTILE = 5.0
+
+    # --- Near-Duplicate Detection ---
+    # Near-duplicates are collapsed into the original feedback (its
+    # duplicate_count is incremented) and do not move any scores.
+
+    DEDUP_ENABLED = True
+
+    # Minimum word-set (Jaccard) similarity to count as a duplicate; MinHash
+    # only finds candidates, each is confirmed with the exact similarity.
+    DEDUP_SIMILARITY_THRESHOLD = 0.75
+
+    # Window for duplicates from the same user about the same entity.
+    DEDUP_USER_WINDOW_MINUTES = 60
+
+    # Window for duplicates across all users; only texts with at least
+    # DEDUP_GLOBAL_MIN_TOKENS words are checked globally.
+    DEDUP_GLOBAL_WINDOW_MINUTES = 10
+    DEDUP_GLOBAL_MIN_TOKENS = 6
+
+    # Memory bounds: indexed messages per scope, and entries per LSH bucket.
+    DEDUP_MAX_ENTRIES = 100000
+    DEDUP_MAX_BUCKET_SIZE = 16
+
+    # --- Live Event Stream (SSE) ---
+
+    # Events buffered per client before a slow client is dropped.
+    SSE_CLIENT_BUFFER_SIZE = 100
+
+    # Maximum number of concurrent stream subscribers.
+    SSE_MAX_SUBSCRIBERS = 200
+
+    # Seconds between keep-alive comments on an idle stream.
+    SSE_HEARTBEAT_SECONDS = 15
+
+    # Lifetime of the stream tokens from POST /api/admin/stream/token.
+    # Browsers' EventSource cannot send an Authorization header, so the
+    # stream also accepts one of these in its `token` query parameter.
+    SSE_STREAM_TOKEN_SECONDS = 60
+
+    # --- Feedback Submission Rate Limiting ---
+
+    RATE_LIMIT_ENABLED = True
+
+    # Token-bucket limits per entity type: `burst` submissions at once,
+    # refilled at `rate_per_minute`. Unlisted types use "default".
+    RATE_LIMITS = {
+        "default": {"rate_per_minute": 10, "burst": 5},
+        "DRIVER": {"rate_per_minute": 10, "burst": 5},
+        "TRIP": {"rate_per_minute": 10, "burst": 5},
+        "APP": {"rate_per_minute": 5, "burst": 3}
+    }
+
+    # Also limit by client IP (same rates), on top of the JWT identity.
+    RATE_LIMIT_BY_IP = False
+
+    # Upper bound on in-memory buckets; idle buckets are evicted first.
+    RATE_LIMIT_MAX_BUCKETS = 100000
+
+    # --- Alert Notifications ---
+
+    # Webhook sinks that receive alert notifications (POSTed as JSON).
+    # Alerts are queued in the `alert_outbox` table with the alert itself
+    # and delivered by a background dispatcher. Example:
+    # {"name": "ops", "url": "https://hooks.example.com/alerts",
+    #  "headers": {"Authorization": "Bearer ..."}, "concurrency": 2, "batch_size": 50}
+    ALERT_WEBHOOK_SINKS = []
+
+    # Per-sink defaults: concurrent requests, and notifications per request.
+    ALERT_WEBHOOK_CONCURRENCY = 2
+    ALERT_WEBHOOK_BATCH_SIZE = 50
+    ALERT_WEBHOOK_TIMEOUT_SECONDS = 5
+
+    # Outbox rows claimed per dispatch cycle, idle poll interval, and how
+    # long a claim is held before another dispatcher may retry the row.
+    ALERT_DISPATCH_BATCH_SIZE = 500
+    ALERT_DISPATCH_POLL_SECONDS = 2
+    ALERT_DISPATCH_LEASE_SECONDS = 60
+
+    # Failed deliveries retry with exponential backoff (with jitter)
+    # until ALERT_DISPATCH_MAX_ATTEMPTS, then are marked failed.
+    ALERT_RETRY_BASE_SECONDS = 5
+    ALERT_RETRY_MAX_SECONDS = 600
+    ALERT_DISPATCH_MAX_ATTEMPTS = 8
+
+    # --- Sentiment Result Cache ---
+
+    # Results are cached by (classifier version, normalized text), in an
+    # in-memory LRU of SENTIMENT_CACHE_SIZE entries and, if a path is
+    # set, in a SQLite file that survives restarts and backfills.
+    # Worth enabling for a model costlier than the lexicon classifier,
+    # which is about as cheap as a cache lookup.
+    SENTIMENT_CACHE_ENABLED = False
+    SENTIMENT_CACHE_SIZE = 100000
+    SENTIMENT_CACHE_PATH = None  # e.g. os.path.join(basedir, 'sentiment_cache.db')
+
+    # --- Asyncio Ingest Front End (ingest_app.py) ---
+
+    # Largest accepted feedback request body.
+    INGEST_MAX_BODY_BYTES = 64 * 1024
+
+    # Submissions handed to the queue per batch, and the most that may
+    # wait for the queue before new ones get a 503.
+    INGEST_QUEUE_BATCH_SIZE = 256
+    INGEST_MAX_PENDING = 10000
+
+    # Threads for the Flask routes the ingest app serves through its WSGI
+    # bridge. Each open event stream holds one for its lifetime, so the
+    # pool has SSE_MAX_SUBSCRIBERS threads on top of these.
+    INGEST_WSGI_THREADS = 32
+
+    # --- Idempotent Submission ---
+
+    # How long an accepted Idempotency-Key is remembered in memory, and
+    # the most keys kept (oldest evicted first, roughly 90 bytes each).
+    IDEMPOTENCY_TTL_HOURS = 24
+    IDEMPOTENCY_MAX_KEYS = 2000000
+
+    # Longest client-supplied key accepted.
+    IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+    # --- Logging ---
+
+    LOG_LEVEL = "INFO"
+
+    # "text" or "json" (one JSON object per line).
+    LOG_FORMAT = "text"
+
+    # INFO/DEBUG lines are limited to LOG_SAMPLE_BURST per call site
+    # every LOG_SAMPLE_INTERVAL_SECONDS; the rest are counted and dropped.
+    LOG_SAMPLE_INTERVAL_SECONDS = 10
+    LOG_SAMPLE_BURST = 20
+
     # --- Feature Flags ---
     FEATURE_FLAGS = {
         "DRIVER": True,
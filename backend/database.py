@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from config import Config
@@ -29,8 +29,50 @@ def init_db():
     from models.user import User
     from models.driver import DriverScore
     from models.feedback import Feedback
-    from models.alert import AlertLog
+    from models.alert import AlertLog, AlertOutbox
+    from models.entity_score import EntityScore
+    from models.config_snapshot import ConfigSnapshot, ConfigWorker
     
     # Create all tables
     Base.metadata.create_all(bind=engine)
-    print("Database tables initialized.")
\ No newline at end of file
+    _add_missing_columns()
+    _add_missing_indexes()
+    print("Database tables initialized.")
+
+def _add_missing_columns():
+    """
+    `create_all` never alters existing tables, so columns added to a model
+    after its table was created are added here with a plain ALTER TABLE.
+    New columns must be nullable or carry a `server_default`.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+                print(f"Added missing column {table.name}.{column.name}")
+
+def _add_missing_indexes():
+    """
+    Likewise, `create_all` only creates a model's indexes along with its
+    table, so indexes (including unique ones) declared later are created
+    here for tables that already exist.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind=engine)
+            print(f"Added missing index {index.name}")
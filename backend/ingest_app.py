@@ -0,0 +1,390 @@
+"""
+Optional asyncio (ASGI) front end for feedback submission.
+
+Flask's WSGI model holds a thread per in-flight request, so thousands of
+slow mobile clients need thousands of threads just to check a JWT and
+put a job on the queue. This app serves `POST /api/feedback` (and
+`/health`) on an event loop instead, with the same validation, feature
+flags, idempotency, rate limits and JWT settings as the Flask route, and
+hands jobs to the Flask app's queue and worker through a batched bridge.
+
+Every other path is passed to the Flask app itself through a small
+WSGI bridge (threads, like the Flask server), so run it *instead of*
+`app.py`, as the only process (uvicorn is an optional dependency;
+`uvicorn[standard]` adds the faster httptools parser and uvloop):
+    cd backend
+    uvicorn ingest_app:create_ingest_app --factory --port 5001 \\
+        --backlog 4096 --timeout-keep-alive 75
+
+One process then owns the single queue and worker and all in-memory
+state: rate-limit buckets, the idempotency index, near-duplicate index,
+negative-rate windows and the live event stream. Running more processes
+(app.py next to it, or `--workers N`) gives each its own copy of that
+state: limits apply per process, events only reach streams on the
+process that handled the feedback, and several workers write to the
+database. Raise the open-file limit (`ulimit -n`) above the number of
+connections to hold; see benchmarks/ingest_load.py.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+from flask_jwt_extended.exceptions import JWTExtendedException
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from api.decorator import token_from_header, verified_token_claims
+from api.feedback_intake import prepare_submission
+
+log = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when too many submissions are already waiting for the queue."""
+    pass
+
+
+class AsyncQueueBridge:
+    """
+    Hands jobs from the event loop to a (thread-safe, possibly blocking)
+    AbstractQueue in batches.
+
+    `put` parks the job and resolves once it is actually on the queue, so
+    a 202 still means "queued". A single flusher thread drains waiting
+    jobs with `put_batch`; everything that arrives while a batch is being
+    put goes into the next one, so batches grow with the load and the
+    event loop never blocks on the queue's lock.
+    """
+    def __init__(self, queue, batch_size: int = None, max_pending: int = None):
+        self.queue = queue
+        self.batch_size = batch_size or Config.INGEST_QUEUE_BATCH_SIZE
+        self.max_pending = max_pending or Config.INGEST_MAX_PENDING
+        self.batches = 0
+        self.items = 0
+        self._pending = deque()
+        self._flush_task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-queue")
+
+    async def put(self, item):
+        """
+        Raises:
+            QueueFull: if `max_pending` jobs are already waiting.
+        """
+        if len(self._pending) >= self.max_pending:
+            raise QueueFull("Too many submissions waiting for the queue")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if self._flush_task is None:
+            # Runs on the next loop iteration, after this tick's other puts
+            self._flush_task = loop.create_task(self._flush(loop))
+        await future
+
+    async def _flush(self, loop):
+        try:
+            while self._pending:
+                count = min(len(self._pending), self.batch_size)
+                batch = [self._pending.popleft() for _ in range(count)]
+                try:
+                    await loop.run_in_executor(self._executor, self.queue.put_batch, [item for item, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for _, future in batch:
+                    # A client that disconnected meanwhile has cancelled its future
+                    if not future.done():
+                        future.set_result(None)
+                self.batches += 1
+                self.items += count
+        finally:
+            self._flush_task = None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class WsgiBridge:
+    """
+    Minimal WSGI-to-ASGI adapter for the Flask routes.
+
+    Each request runs on a thread from a bounded pool and its body chunks
+    are sent as the app yields them, so streamed responses (the SSE
+    stream) work. A client disconnect is noticed at the next chunk, which
+    stops the iteration and closes the response, the way Flask's own
+    server notices a failed write.
+    """
+    def __init__(self, app, threads: int = None):
+        self.app = app
+        threads = threads or Config.INGEST_WSGI_THREADS + Config.SSE_MAX_SUBSCRIBERS
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ingest-wsgi")
+
+    async def __call__(self, scope, receive, send):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        loop = asyncio.get_running_loop()
+        disconnected = threading.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = loop.create_task(watch_disconnect())
+        try:
+            await loop.run_in_executor(
+                self._executor, self._run, loop, scope, b"".join(chunks), send, disconnected
+            )
+        finally:
+            watcher.cancel()
+
+    def shutdown(self):
+        # Open streams only notice at their next heartbeat; don't wait for them
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, loop, scope, body, send, disconnected):
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["start"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+            }
+            return lambda data: None  # The legacy write() callable is not supported
+
+        iterable = self.app(self._environ(scope, body), start_response)
+        try:
+            for chunk in iterable:
+                if disconnected.is_set():
+                    return
+                if not chunk:
+                    continue
+                if not response.get("sent"):
+                    send_message(response["start"])
+                    response["sent"] = True
+                send_message({"type": "http.response.body", "body": chunk, "more_body": True})
+            if not response.get("sent"):
+                send_message(response["start"])
+            send_message({"type": "http.response.body", "body": b""})
+        except Exception as e:
+            # Usually the client went away mid-response
+            log.info("WSGI response to %s ended early: %s", scope["path"], e)
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client")
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0] if client else "",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1").upper().replace("-", "_")
+            key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+            value = value.decode("latin-1")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        # The body is already buffered, so its length is known even for chunked uploads
+        environ["CONTENT_LENGTH"] = str(len(body))
+        environ.pop("HTTP_TRANSFER_ENCODING", None)
+        return environ
+
+
+class IngestApp:
+    """
+    ASGI application for `POST /api/feedback`.
+
+    `flask_app` supplies the JWT settings; the queue, rate limiter and
+    idempotency index are the ones the Flask route uses in this process.
+    With `serve_flask`, every other path is served by `flask_app` through
+    a WsgiBridge; otherwise they get a 404.
+    """
+    def __init__(self, flask_app, queue_service, rate_limiter=None, idempotency_index=None, serve_flask: bool = True):
+        self.flask_app = flask_app
+        self.wsgi = WsgiBridge(flask_app) if serve_flask else None
+        self.identity_claim = flask_app.config.get("JWT_IDENTITY_CLAIM", "sub")
+        self.header_name = flask_app.config.get("JWT_HEADER_NAME", "Authorization")
+        self.rate_limiter = rate_limiter
+        self.idempotency_index = idempotency_index
+        self.bridge = AsyncQueueBridge(queue_service)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"].rstrip("/")
+        method = scope["method"]
+        if path == "/health" and method == "GET":
+            response = (200, {"status": "healthy"}, {})
+        elif path != "/api/feedback" and self.wsgi is not None:
+            await self.wsgi(scope, receive, send)
+            return
+        elif path != "/api/feedback":
+            response = (404, {"error": "Not found"}, {})
+        elif method != "POST":
+            response = (405, {"error": "Method not allowed"}, {"Allow": "POST"})
+        else:
+            try:
+                response = await self.submit_feedback(scope, receive)
+            except ConnectionError:
+                # The client went away before sending its whole body
+                return
+        await self._send_json(send, *response)
+
+    async def submit_feedback(self, scope, receive):
+        """
+        Mirrors the Flask `submit_feedback` route and returns
+        (status, JSON body, headers).
+        """
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+
+        # --- JWT (same settings and claims cache as the Flask app) ---
+        # Error bodies follow flask_jwt_extended's default handlers
+        token = token_from_header(self.flask_app.config, headers.get(self.header_name.lower(), ""))
+        if token is None:
+            return 401, {"msg": f"Missing {self.header_name} Header"}, {}
+        try:
+            claims = verified_token_claims(self.flask_app, token)
+            current_user_id = claims[self.identity_claim]
+        except jwt.ExpiredSignatureError:
+            return 401, {"msg": "Token has expired"}, {}
+        except (jwt.InvalidTokenError, JWTExtendedException, KeyError) as e:
+            log.warning("Rejected feedback token: %s", e)
+            return 422, {"msg": str(e)}, {}
+
+        body = await self._read_body(receive)
+        if body is None:
+            return 413, {"error": f"Request body exceeds {Config.INGEST_MAX_BODY_BYTES} bytes"}, {}
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, {"error": "Request body must be valid JSON."}, {}
+
+        # --- Validation, feature flags, idempotency and rate limits ---
+        client = scope.get("client")
+        submission = prepare_submission(
+            current_user_id, data,
+            rate_limiter=self.rate_limiter,
+            idempotency_index=self.idempotency_index,
+            idempotency_header=headers.get("idempotency-key"),
+            remote_addr=client[0] if client else None
+        )
+        if submission.response is not None:
+            return submission.response
+
+        try:
+            await self.bridge.put(submission.job)
+        except QueueFull:
+            submission.release()
+            log.info("Feedback ingest backlog full, rejected submission from user %s", current_user_id)
+            return 503, {"error": "Too many pending submissions, please retry"}, {"Retry-After": "1"}
+        except Exception as e:
+            submission.release()
+            log.error(f"Failed to queue feedback: {e}", exc_info=True)
+            return 500, {"error": f"Internal server error: {e}"}, {}
+
+        job = submission.job
+        log.info("Queued feedback for %s:%s from user %s", job["entity_type"], job["entity_id"], current_user_id)
+        return submission.accepted()
+
+    async def _read_body(self, receive):
+        """
+        Returns the request body, or None if it exceeds INGEST_MAX_BODY_BYTES.
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ConnectionError("Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > Config.INGEST_MAX_BODY_BYTES:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _send_json(self, send, status, body, headers):
+        payload = json.dumps(body).encode("utf-8")
+        raw_headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode("latin-1"))
+        ]
+        raw_headers.extend((name.lower().encode("latin-1"), str(value).encode("latin-1")) for name, value in headers.items())
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.bridge.shutdown()
+                if self.wsgi is not None:
+                    self.wsgi.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_ingest_app(flask_app=None, serve_flask: bool = True):
+    """
+    Builds the ingest app on top of a Flask app (created with the usual
+    `create_app()` if not given), sharing its queue, worker, rate limiter
+    and idempotency index, and serving its other routes unless
+    `serve_flask` is False.
+    """
+    from app import create_app
+    from backend.api.feedback_routes import feedback_bp
+
+    flask_app = flask_app or create_app()
+    return IngestApp(
+        flask_app,
+        queue_service=feedback_bp.queue_service,
+        rate_limiter=getattr(feedback_bp, 'rate_limiter', None),
+        idempotency_index=getattr(feedback_bp, 'idempotency_index', None),
+        serve_flask=serve_flask
+    )
@@ -0,0 +1,125 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from config import Config
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    A QueueHandler that leaves most formatting to the listener thread.
+
+    The stock handler runs the full formatter (timestamp, level, traceback)
+    before enqueueing. This one only merges `msg % args` on the caller's
+    thread, since args may be mutable objects the caller changes before
+    the listener gets to the record. The rest of the formatting is deferred.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as a single-line JSON object.
+    """
+    def format(self, record):
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class TextFormatter(logging.Formatter):
+    """
+    The default text format, noting how many similar lines were suppressed.
+    """
+    def format(self, record):
+        line = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" [{suppressed} similar lines suppressed]"
+        return line
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records through per call site (file and line)
+    every `interval` seconds. WARNING and above are never limited.
+
+    The first record let through after a suppressed run carries the
+    number of records dropped in its `suppressed` attribute.
+    """
+    def __init__(self, interval: float, burst: int):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        site = (record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            # [window_start, emitted_in_window, suppressed_since_last_emit]
+            state = self._sites.get(site)
+            if state is None or now - state[0] >= self.interval:
+                suppressed = state[2] if state else 0
+                self._sites[site] = [now, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed, state[2] = state[2], 0
+            else:
+                state[2] += 1
+                return False
+
+        record.suppressed = suppressed
+        return True
+
+_listener = None
+
+def setup_logging():
+    """
+    Routes all logging through a queue so that formatting and I/O happen
+    on a background listener thread instead of on request/worker threads.
+    Replaces any handlers already installed on the root logger.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if Config.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(Config.LOG_SAMPLE_INTERVAL_SECONDS, Config.LOG_SAMPLE_BURST))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(Config.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(_listener.stop)
@@ -1,7 +1,20 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 from database import Base
+import enum
+
+class AlertRule(enum.Enum):
+    """Enum for the different rules that can raise an alert."""
+    EMA_THRESHOLD = "ema_threshold"
+    NEGATIVE_RATE = "negative_rate"
+
+class OutboxStatus(enum.Enum):
+    """Delivery state of an alert notification in the outbox."""
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
 
 class AlertLog(Base):
     """
@@ -13,7 +26,10 @@ class AlertLog(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     driver_id = Column(String, ForeignKey('drivers.id'), nullable=False, index=True)
     
-    # The score that triggered this alert
+    # The alert rule that fired (see AlertRule)
+    rule = Column(String(50), nullable=False, default=AlertRule.EMA_THRESHOLD.value, server_default=AlertRule.EMA_THRESHOLD.value)
+    
+    # The value that triggered this alert (EMA score, or negative rate)
     score_at_alert = Column(Float, nullable=False)
     
     # The threshold that was active at the time
@@ -22,4 +38,43 @@ class AlertLog(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship
-    driver = relationship("Driver", back_populates="alerts")
\ No newline at end of file
+    driver = relationship("Driver", back_populates="alerts")
+
+class AlertOutbox(Base):
+    """
+    Model for one pending notification of an alert to one webhook sink.
+
+    Rows are written in the same transaction as the AlertLog, so an alert
+    is notified if and only if it was committed; the AlertDispatcher
+    delivers them later, outside of any feedback transaction.
+    """
+    __tablename__ = 'alert_outbox'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    alert_id = Column(Integer, ForeignKey('alert_logs.id'), nullable=False)
+    driver_id = Column(String(100), nullable=False)
+
+    # Name of the sink in ALERT_WEBHOOK_SINKS
+    sink = Column(String(100), nullable=False)
+
+    # JSON notification body for this alert
+    payload = Column(Text, nullable=False)
+
+    status = Column(String(20), nullable=False, default=OutboxStatus.PENDING.value)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    # Earliest time of the next delivery attempt (retry backoff and claim lease)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    # Set by the dispatcher that claimed the row for delivery
+    claim_token = Column(String(64), nullable=True, index=True)
+
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    alert = relationship("AlertLog")
+
+    __table_args__ = (
+        Index('ix_alert_outbox_due', 'status', 'next_attempt_at'),
+    )
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from sqlalchemy.sql import func
+from database import Base
+
+class ConfigSnapshot(Base):
+    """
+    Model for one immutable, versioned copy of the runtime configuration.
+    A change never edits a row; it inserts the next version.
+    """
+    __tablename__ = 'config_snapshots'
+
+    version = Column(Integer, primary_key=True)
+
+    # JSON object of Config attribute name -> value
+    values = Column(Text, nullable=False)
+
+    # The admin user (JWT identity) who published this version
+    created_by = Column(String(100), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ConfigWorker(Base):
+    """
+    Model for the config version each running process has applied.
+    Every process upserts its own row whenever it polls for new versions.
+    """
+    __tablename__ = 'config_workers'
+
+    # "<hostname>:<pid>"
+    worker_id = Column(String(255), primary_key=True)
+
+    version = Column(Integer, nullable=False)
+
+    last_seen = Column(DateTime(timezone=True), nullable=False)
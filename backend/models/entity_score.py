@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Float, Text, DateTime, Enum
+from sqlalchemy.sql import func
+from database import Base
+from models.feedback import FeedbackEntityType
+
+class EntityScore(Base):
+    """
+    Model to hold one aggregated value for any feedback entity.
+    There is one row per (entity_type, entity_id, aggregator), so new
+    aggregators can be added without schema changes.
+    """
+    __tablename__ = 'entity_scores'
+
+    entity_type = Column(Enum(FeedbackEntityType), primary_key=True)
+    entity_id = Column(String(100), primary_key=True)
+
+    # Name of the aggregator that produced this value (e.g. 'ema', 'count')
+    aggregator = Column(String(50), primary_key=True)
+
+    # The current aggregated value, exposed to the admin API
+    value = Column(Float, nullable=True)
+
+    # JSON-encoded internal state the aggregator needs for its next update
+    state = Column(Text, nullable=False, default="{}")
+
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
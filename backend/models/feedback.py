@@ -34,6 +34,13 @@ class Feedback(Base):
     # The score (1-5) assigned by the sentiment service
     sentiment_score = Column(Float, nullable=True)
     
+    # Client-supplied Idempotency-Key, scoped as "<user_id>:<key>".
+    # Unique so a retried submission can never be stored twice.
+    idempotency_key = Column(String(255), nullable=True, unique=True, index=True)
+    
+    # Number of near-duplicate submissions collapsed into this row
+    duplicate_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # --- Example of relating to a driver ---
@@ -0,0 +1,380 @@
+import hashlib
+import http.client
+import json
+import logging
+import queue
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+from sqlalchemy import func
+from models.alert import AlertOutbox, OutboxStatus
+from config import Config
+
+class DeliveryError(Exception):
+    """
+    Raised when a sink does not accept a delivery. `retryable` is False
+    for errors that another attempt cannot fix (e.g. HTTP 400).
+    """
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one URL, reused across requests.
+    At most `size` idle connections are kept.
+    """
+    # Errors that mean a reused keep-alive connection was closed by the server
+    STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, url: str, size: int, timeout: float):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported webhook URL: {url}")
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def post(self, body: bytes, headers: dict):
+        """
+        POSTs `body` and returns (status, response body). A request on a
+        reused connection the server has since closed is retried once on
+        a fresh connection.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._send(self._connect(), body, headers)
+        try:
+            return self._send(conn, body, headers)
+        except self.STALE_ERRORS:
+            return self._send(self._connect(), body, headers)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _connect(self):
+        self.connections_opened += 1
+        return self.connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _send(self, conn, body: bytes, headers: dict):
+        try:
+            conn.request("POST", self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status, data
+
+class WebhookSink:
+    """
+    One notification destination. Deliveries run on the sink's own
+    thread pool, so a slow sink never uses more than `concurrency`
+    connections or delays the others beyond its timeout.
+    """
+    def __init__(self, name: str, url: str, headers: dict = None, concurrency: int = None,
+                 batch_size: int = None, timeout: float = None):
+        self.name = name
+        self.url = url
+        self.headers = dict(headers or {})
+        self.concurrency = concurrency or Config.ALERT_WEBHOOK_CONCURRENCY
+        self.batch_size = batch_size or Config.ALERT_WEBHOOK_BATCH_SIZE
+        self.pool = ConnectionPool(url, self.concurrency, timeout or Config.ALERT_WEBHOOK_TIMEOUT_SECONDS)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"webhook-{name}")
+
+    @classmethod
+    def from_config(cls, spec: dict):
+        return cls(
+            name=spec["name"],
+            url=spec["url"],
+            headers=spec.get("headers"),
+            concurrency=spec.get("concurrency"),
+            batch_size=spec.get("batch_size"),
+            timeout=spec.get("timeout")
+        )
+
+    def deliver(self, notifications: list, delivery_id: str):
+        """
+        POSTs one batch of notifications.
+
+        Raises:
+            DeliveryError: if the sink does not answer with a 2xx status.
+        """
+        body = json.dumps({"sink": self.name, "notifications": notifications}).encode("utf-8")
+        headers = {
+            **self.headers,
+            "Content-Type": "application/json",
+            # Lets the receiver drop a batch it already processed on retry
+            "Idempotency-Key": delivery_id
+        }
+        try:
+            status, data = self.pool.post(body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            raise DeliveryError(f"{type(e).__name__}: {e}")
+
+        if 200 <= status < 300:
+            return
+        retryable = status >= 500 or status in (408, 429)
+        raise DeliveryError(f"HTTP {status}: {data[:200]!r}", retryable=retryable)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+class AlertDispatcher:
+    """
+    Delivers queued alert notifications from the `alert_outbox` table
+    to the configured webhook sinks, outside of any feedback transaction.
+
+    Each cycle claims up to `ALERT_DISPATCH_BATCH_SIZE` due rows (a lease,
+    so several dispatchers can share one outbox), then:
+    - coalesces the rows for the same sink and driver into one
+      notification listing every alert,
+    - batches up to the sink's `batch_size` notifications per request,
+    - sends the requests on each sink's bounded pool of keep-alive
+      connections, and
+    - marks delivered rows sent, and reschedules failed ones with
+      exponential backoff until `ALERT_DISPATCH_MAX_ATTEMPTS`.
+    """
+    def __init__(self, db_session_factory, sinks: list = None):
+        self.db_session_factory = db_session_factory
+        if sinks is None:
+            sinks = [WebhookSink.from_config(spec) for spec in Config.ALERT_WEBHOOK_SINKS]
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.is_running = True
+        self.dispatch_thread = None
+        self._wakeup = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"alerts_sent": 0, "notifications_sent": 0, "requests_sent": 0,
+                       "requests_failed": 0, "alerts_retried": 0, "alerts_failed": 0}
+
+    def wake(self):
+        """
+        Starts a cycle now instead of at the next poll (e.g. right after
+        a batch that raised alerts has committed).
+        """
+        self._wakeup.set()
+
+    def start_dispatch_thread(self):
+        """
+        Starts the dispatch loop in a new daemon thread.
+        """
+        self.dispatch_thread = threading.Thread(target=self.run_dispatcher, daemon=True)
+        self.dispatch_thread.start()
+
+    def stop_dispatcher(self):
+        """
+        Signals the dispatch thread to stop and releases the sinks.
+        """
+        self.is_running = False
+        self._wakeup.set()
+        for sink in self.sinks.values():
+            sink.shutdown()
+
+    def run_dispatcher(self):
+        logging.info("Alert dispatcher is running for sinks: %s", ", ".join(self.sinks))
+        while self.is_running:
+            self._wakeup.clear()
+            try:
+                claimed = self.dispatch_once()
+            except Exception as e:
+                logging.error(f"Alert dispatch cycle failed: {e}", exc_info=True)
+                claimed = 0
+            # A full batch means more rows are probably due already
+            if claimed < Config.ALERT_DISPATCH_BATCH_SIZE:
+                self._wakeup.wait(Config.ALERT_DISPATCH_POLL_SECONDS)
+
+    def dispatch_once(self) -> int:
+        """
+        Runs one claim-deliver-record cycle and returns the number of
+        outbox rows claimed.
+        """
+        token = uuid.uuid4().hex
+        rows = self._claim(token)
+        if not rows:
+            return 0
+
+        # Coalesce: one notification per (sink, driver), oldest alert first
+        groups = {}
+        for row in rows:
+            groups.setdefault((row["sink"], row["driver_id"]), []).append(row)
+
+        by_sink = {}
+        for (sink_name, driver_id), group in groups.items():
+            alerts = [dict(json.loads(row["payload"]), alert_id=row["alert_id"]) for row in group]
+            notification = {"driver_id": driver_id, "count": len(alerts), "latest": alerts[-1], "alerts": alerts}
+            by_sink.setdefault(sink_name, []).append((notification, group))
+
+        outcomes = []
+        pending = []
+        for sink_name, items in by_sink.items():
+            sink = self.sinks.get(sink_name)
+            if sink is None:
+                error = DeliveryError(f"Unknown sink '{sink_name}'", retryable=False)
+                outcomes.append(([row for _, group in items for row in group], error, 0))
+                continue
+            for start in range(0, len(items), sink.batch_size):
+                chunk = items[start:start + sink.batch_size]
+                chunk_rows = [row for _, group in chunk for row in group]
+                delivery_id = hashlib.sha256(",".join(str(row["id"]) for row in chunk_rows).encode()).hexdigest()
+                future = sink.executor.submit(sink.deliver, [notification for notification, _ in chunk], delivery_id)
+                pending.append((future, chunk_rows, len(chunk)))
+
+        for future, chunk_rows, notification_count in pending:
+            try:
+                future.result()
+                outcomes.append((chunk_rows, None, notification_count))
+            except DeliveryError as e:
+                outcomes.append((chunk_rows, e, notification_count))
+            except Exception as e:
+                outcomes.append((chunk_rows, DeliveryError(f"{type(e).__name__}: {e}"), notification_count))
+
+        self._record(token, outcomes)
+        return len(rows)
+
+    def stats(self) -> dict:
+        """
+        Returns delivery counters for this process and the outbox backlog.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        db = self.db_session_factory()
+        try:
+            counts = db.query(AlertOutbox.status, func.count(AlertOutbox.id)).group_by(AlertOutbox.status).all()
+        finally:
+            db.close()
+        stats["outbox"] = {status: count for status, count in counts}
+        stats["sinks"] = {
+            name: {"url": sink.url, "concurrency": sink.concurrency, "batch_size": sink.batch_size,
+                   "connections_opened": sink.pool.connections_opened}
+            for name, sink in self.sinks.items()
+        }
+        return stats
+
+    def _claim(self, token: str) -> list:
+        """
+        Leases the oldest due rows to this cycle and returns them as plain
+        dicts, so that no session or transaction is held during delivery.
+        """
+        db = self.db_session_factory()
+        try:
+            now = datetime.now(timezone.utc)
+            due = AlertOutbox.status == OutboxStatus.PENDING.value, AlertOutbox.next_attempt_at <= now
+            candidates = [row_id for (row_id,) in db.query(AlertOutbox.id).filter(*due)
+                          .order_by(AlertOutbox.id).limit(Config.ALERT_DISPATCH_BATCH_SIZE)]
+            if not candidates:
+                return []
+
+            # Conditional update: rows another dispatcher claimed meanwhile are skipped
+            db.query(AlertOutbox).filter(AlertOutbox.id.in_(candidates), *due).update({
+                AlertOutbox.claim_token: token,
+                AlertOutbox.next_attempt_at: now + timedelta(seconds=Config.ALERT_DISPATCH_LEASE_SECONDS)
+            }, synchronize_session=False)
+            rows = db.query(AlertOutbox).filter(AlertOutbox.claim_token == token).order_by(AlertOutbox.id).all()
+            claimed = [
+                {
+                    "id": row.id,
+                    "alert_id": row.alert_id,
+                    "driver_id": row.driver_id,
+                    "sink": row.sink,
+                    "payload": row.payload,
+                    "attempts": row.attempts
+                } for row in rows
+            ]
+            db.commit()
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record(self, token: str, outcomes: list):
+        """
+        Stores the delivery outcomes. Updates are limited to rows still
+        held by this cycle's claim.
+        """
+        db = self.db_session_factory()
+        sent = retried = failed = notifications = failed_requests = 0
+        try:
+            now = datetime.now(timezone.utc)
+            for rows, error, notification_count in outcomes:
+                if error is None:
+                    db.query(AlertOutbox).filter(
+                        AlertOutbox.id.in_([row["id"] for row in rows]),
+                        AlertOutbox.claim_token == token
+                    ).update({
+                        AlertOutbox.status: OutboxStatus.SENT.value,
+                        AlertOutbox.attempts: AlertOutbox.attempts + 1,
+                        AlertOutbox.sent_at: now,
+                        AlertOutbox.claim_token: None,
+                        AlertOutbox.last_error: None
+                    }, synchronize_session=False)
+                    sent += len(rows)
+                    notifications += notification_count
+                    continue
+
+                failed_requests += 1
+                for row in rows:
+                    attempts = row["attempts"] + 1
+                    values = {
+                        AlertOutbox.attempts: attempts,
+                        AlertOutbox.claim_token: None,
+                        AlertOutbox.last_error: str(error)[:500]
+                    }
+                    if not error.retryable or attempts >= Config.ALERT_DISPATCH_MAX_ATTEMPTS:
+                        values[AlertOutbox.status] = OutboxStatus.FAILED.value
+                        failed += 1
+                    else:
+                        values[AlertOutbox.next_attempt_at] = now + timedelta(seconds=self._backoff(attempts))
+                        retried += 1
+                    db.query(AlertOutbox).filter(
+                        AlertOutbox.id == row["id"],
+                        AlertOutbox.claim_token == token
+                    ).update(values, synchronize_session=False)
+                logging.warning("Alert delivery to sink '%s' failed (%d alert(s)): %s", rows[0]["sink"], len(rows), error)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        with self._stats_lock:
+            self._stats["alerts_sent"] += sent
+            self._stats["notifications_sent"] += notifications
+            self._stats["requests_sent"] += len(outcomes) - failed_requests
+            self._stats["requests_failed"] += failed_requests
+            self._stats["alerts_retried"] += retried
+            self._stats["alerts_failed"] += failed
+        if sent:
+            logging.info("Delivered %d alert(s) as %d notification(s)", sent, notifications)
+
+    @staticmethod
+    def _backoff(attempts: int) -> float:
+        """
+        Exponential backoff with jitter: half to all of base * 2^(attempts - 1),
+        capped at ALERT_RETRY_MAX_SECONDS.
+        """
+        delay = min(Config.ALERT_RETRY_BASE_SECONDS * 2 ** (attempts - 1), Config.ALERT_RETRY_MAX_SECONDS)
+        return random.uniform(delay / 2, delay)
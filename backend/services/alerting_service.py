@@ -1,55 +1,121 @@
+import json
 import logging
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from models.driver import Driver
-from models.alert import AlertLog
+from models.alert import AlertLog, AlertOutbox, AlertRule
+from services.negative_rate_tracker import NegativeRateTracker
+from services.config_store import runtime_config
 from config import Config
 
 class AlertingService:
     """
     Handles the logic for checking and raising alerts,
     including throttling.
+
+    Two rules are supported:
+    - EMA threshold: the driver's EMA score drops below `ALERT_THRESHOLD`.
+    - Negative rate: the share of negative feedback in the driver's recent
+      window reaches `NEGATIVE_RATE_THRESHOLD`.
+
+    Every raised alert is also queued in the alert outbox, once per
+    configured webhook sink, in the caller's transaction. Delivery is
+    left to the AlertDispatcher so no network call happens while the
+    feedback transaction is open.
     """
+    def __init__(self, negative_rate_tracker: NegativeRateTracker = None):
+        self.negative_rate_tracker = negative_rate_tracker or NegativeRateTracker()
     
-    def check_and_raise_alert(self, db: Session, driver_id: str, new_score: float):
+    def check_and_raise_alert(self, db: Session, driver_id: str, new_score: float, feedback_score: float = None, journal: dict = None):
         """
-        Checks if the new score triggers an alert and if the alert
-        is throttled.
+        Checks if the new score (or the latest feedback score) triggers
+        an alert and if the alert is throttled.
         
         If an alert is raised, it's logged to the AlertLog table.
+        Pass the same `journal` dict for a whole transaction and call
+        `discard(journal)` if it rolls back.
+
+        Returns:
+            The list of AlertLog entries raised (usually empty).
         """
-        threshold = Config.ALERT_THRESHOLD
+        config = runtime_config()
+        raised = []
+        threshold = config.ALERT_THRESHOLD
         
-        if new_score >= threshold:
-            # Score is good, no alert needed.
-            return
+        if new_score < threshold:
+            raised.append(self._raise_alert(db, driver_id, AlertRule.EMA_THRESHOLD, new_score, threshold))
+
+        if feedback_score is None:
+            return [alert for alert in raised if alert]
 
-        # Score is below threshold, check for throttling
-        throttle_minutes = Config.ALERT_THROTTLE_MINUTES
+        # Always record, so the window is current when the rule is re-enabled
+        sample_count, negative_rate = self.negative_rate_tracker.record(driver_id, feedback_score, journal=journal)
+
+        rate_threshold = config.NEGATIVE_RATE_THRESHOLD
+        if (config.NEGATIVE_RATE_ALERT_ENABLED
+                and sample_count >= config.NEGATIVE_RATE_MIN_SAMPLES
+                and negative_rate >= rate_threshold):
+            raised.append(self._raise_alert(db, driver_id, AlertRule.NEGATIVE_RATE, negative_rate, rate_threshold))
+
+        return [alert for alert in raised if alert]
+
+    def discard(self, journal: dict):
+        """
+        Undoes the negative-rate samples recorded for a rolled-back
+        transaction.
+        """
+        self.negative_rate_tracker.restore(journal)
+
+    def _raise_alert(self, db: Session, driver_id: str, rule: AlertRule, value: float, threshold: float):
+        """
+        Logs an alert for one rule unless that rule already fired for
+        this driver within the throttle window.
+
+        Returns:
+            The new AlertLog, or None if the alert was throttled.
+        """
+        throttle_minutes = runtime_config().ALERT_THROTTLE_MINUTES
         throttle_cutoff = datetime.now(timezone.utc) - timedelta(minutes=throttle_minutes)
         
         recent_alert = db.query(AlertLog).filter(
             AlertLog.driver_id == driver_id,
+            AlertLog.rule == rule.value,
             AlertLog.timestamp >= throttle_cutoff
         ).first()
         
         if recent_alert:
             # An alert was already sent recently. Do nothing.
-            logging.warning(f"Alert for driver {driver_id} is throttled. New score: {new_score}")
-            return
+            logging.info("%s alert for driver %s is throttled. New value: %s", rule.value, driver_id, value)
+            return None
             
         # --- Raise the Alert! ---
-        # In a real system, this would trigger an email, SMS, or webhook.
-        # For this demo, we'll log it to the console and the DB.
-        
-        print(f"!!! ALERT: Driver {driver_id} score dropped to {new_score:.2f} (Threshold: {threshold}) !!!")
+        logging.warning("ALERT (%s): Driver %s value is %.2f (Threshold: %s)", rule.value, driver_id, value, threshold)
         
         # Log the alert to the database
         new_alert_log = AlertLog(
             driver_id=driver_id,
-            score_at_alert=new_score,
+            rule=rule.value,
+            score_at_alert=value,
             threshold_at_alert=threshold
         )
         db.add(new_alert_log)
+
+        # Queue the webhook notifications; they commit (or roll back) with the alert
+        raised_at = datetime.now(timezone.utc)
+        payload = json.dumps({
+            "rule": rule.value,
+            "value": value,
+            "threshold": threshold,
+            "raised_at": raised_at.isoformat()
+        })
+        for sink in Config.ALERT_WEBHOOK_SINKS:
+            db.add(AlertOutbox(
+                alert=new_alert_log,
+                driver_id=driver_id,
+                sink=sink["name"],
+                payload=payload,
+                next_attempt_at=raised_at
+            ))
         
-        # Commit is handled by the FeedbackProcessor
\ No newline at end of file
+        # Commit is handled by the FeedbackProcessor
+        return new_alert_log
\ No newline at end of file
@@ -0,0 +1,57 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+class VerifiedClaimsCache:
+    """
+    LRU cache of JWT claims that have already passed signature verification.
+
+    Keyed by a SHA-256 digest of the raw token, so the tokens themselves
+    are never held in memory. An entry is served until the earlier of its
+    TTL and the token's own `exp`, so expired tokens are never accepted.
+    """
+    def __init__(self, max_size: int = None, ttl_seconds: float = None):
+        self.max_size = max_size or Config.JWT_CLAIMS_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or Config.JWT_CLAIMS_CACHE_TTL_SECONDS
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token: str, now: float = None):
+        """
+        Returns the cached claims for `token`, or None.
+        """
+        now = time.time() if now is None else now
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now >= entry[1]:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, claims: dict, now: float = None):
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl_seconds
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        if expires_at <= now:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
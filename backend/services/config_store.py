@@ -0,0 +1,279 @@
+import copy
+import json
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models.config_snapshot import ConfigSnapshot, ConfigWorker
+from config import Config
+
+# Config attributes that can change at runtime and are versioned.
+# Everything else on Config is static for the life of the process.
+RUNTIME_KEYS = (
+    "ALERT_THRESHOLD",
+    "EMA_ALPHA",
+    "ALERT_THROTTLE_MINUTES",
+    "NEGATIVE_RATE_ALERT_ENABLED",
+    "NEGATIVE_RATE_THRESHOLD",
+    "NEGATIVE_RATE_WINDOW_SIZE",
+    "NEGATIVE_RATE_WINDOW_MINUTES",
+    "NEGATIVE_RATE_MIN_SAMPLES",
+    "RATE_LIMIT_ENABLED",
+    "RATE_LIMIT_BY_IP",
+    "FEATURE_FLAGS",
+    "RATE_LIMITS",
+)
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+class RuntimeConfig:
+    """
+    One immutable version of the runtime configuration.
+
+    Attribute access mirrors `Config` (e.g. `snapshot.EMA_ALPHA`):
+    runtime keys come from the snapshot, anything else falls through
+    to the static `Config` class.
+    """
+    __slots__ = ("version", "_values")
+
+    def __init__(self, version: int, values: dict):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "_values", MappingProxyType({
+            key: _freeze(copy.deepcopy(item)) for key, item in values.items()
+        }))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            return getattr(Config, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RuntimeConfig snapshots are immutable")
+
+    def to_dict(self) -> dict:
+        return {key: _thaw(value) for key, value in self._values.items()}
+
+_active_store = None
+_pinned = threading.local()
+
+def runtime_config():
+    """
+    Returns the config snapshot the caller should read from: the one
+    pinned for the current batch if any, else the process's latest
+    version, else the static `Config` class (no store installed).
+    """
+    pinned = getattr(_pinned, "config", None)
+    if pinned is not None:
+        return pinned
+    if _active_store is not None:
+        return _active_store.current()
+    return Config
+
+@contextmanager
+def pinned_config():
+    """
+    Pins one snapshot for the current thread, so that a whole batch
+    reads a single config version even if a new one arrives meanwhile.
+    Nested pins keep the outermost snapshot.
+    """
+    previous = getattr(_pinned, "config", None)
+    _pinned.config = previous or runtime_config()
+    try:
+        yield _pinned.config
+    finally:
+        _pinned.config = previous
+
+class ConfigStore:
+    """
+    Stores runtime configuration as immutable, versioned snapshots in the
+    database, so that every process (API servers and workers) converges
+    on the same settings and changes survive restarts.
+
+    Each process polls the latest version number (a primary-key lookup)
+    every `CONFIG_POLL_SECONDS` and only loads the snapshot when it has
+    changed. Publishing uses optimistic concurrency: two processes racing
+    for the same version number cannot both win.
+    """
+    def __init__(self, db_session_factory, poll_seconds: float = None):
+        self.db_session_factory = db_session_factory
+        self.poll_seconds = poll_seconds or Config.CONFIG_POLL_SECONDS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_running = True
+        self.poll_thread = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._current = RuntimeConfig(0, {key: getattr(Config, key) for key in RUNTIME_KEYS})
+
+    def install(self):
+        """
+        Makes this store the source for `runtime_config()` in this process.
+        """
+        global _active_store
+        _active_store = self
+
+    def current(self) -> RuntimeConfig:
+        return self._current
+
+    def load(self):
+        """
+        Loads the latest snapshot, seeding version 1 from the `Config`
+        defaults if the database has none yet.
+        """
+        if self.refresh() is None:
+            try:
+                self.publish({})
+            except IntegrityError:
+                # Another process seeded it first
+                self.refresh()
+
+    def refresh(self):
+        """
+        Applies the latest snapshot if it is newer than the current one.
+        Returns the latest version in the database (None if there is none).
+        """
+        db = self.db_session_factory()
+        try:
+            latest_version = db.query(func.max(ConfigSnapshot.version)).scalar()
+            if latest_version is not None and latest_version > self._current.version:
+                row = db.query(ConfigSnapshot).filter(ConfigSnapshot.version == latest_version).first()
+                self._apply(RuntimeConfig(row.version, json.loads(row.values)))
+            self._heartbeat(db)
+            db.commit()
+            return latest_version
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def publish(self, changes: dict, created_by: str = None) -> RuntimeConfig:
+        """
+        Publishes a new version made of the latest snapshot plus `changes`
+        (Config attribute name -> new value) and applies it locally.
+        Retries if another process publishes the same version first.
+        """
+        unknown = set(changes) - set(RUNTIME_KEYS)
+        if unknown:
+            raise ValueError(f"Not runtime-configurable: {sorted(unknown)}")
+
+        for _ in range(5):
+            self.refresh()
+            with self._lock:
+                base = self._current
+                values = base.to_dict()
+                values.update(copy.deepcopy(changes))
+                snapshot = RuntimeConfig(base.version + 1, values)
+
+            db = self.db_session_factory()
+            try:
+                db.add(ConfigSnapshot(
+                    version=snapshot.version,
+                    values=json.dumps(snapshot.to_dict()),
+                    created_by=created_by
+                ))
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                continue
+            finally:
+                db.close()
+
+            self._apply(snapshot)
+            # refresh() above reported the previous version
+            self._report_version()
+            logging.info("Published config version %d", snapshot.version)
+            return snapshot
+
+        raise RuntimeError("Could not publish config: too many concurrent updates")
+
+    def workers(self) -> list:
+        """
+        Returns the config version each known process last reported.
+        """
+        db = self.db_session_factory()
+        try:
+            rows = db.query(ConfigWorker).order_by(ConfigWorker.last_seen.desc()).all()
+            return [
+                {
+                    "worker_id": row.worker_id,
+                    "version": row.version,
+                    "last_seen": row.last_seen.isoformat() if row.last_seen else None
+                } for row in rows
+            ]
+        finally:
+            db.close()
+
+    def start_poll_thread(self):
+        """
+        Starts the version polling loop in a new daemon thread.
+        """
+        self.poll_thread = threading.Thread(target=self.run_poller, daemon=True)
+        self.poll_thread.start()
+
+    def stop_poller(self):
+        """
+        Signals the polling thread to stop.
+        """
+        self.is_running = False
+        self._wakeup.set()
+
+    def run_poller(self):
+        while self.is_running:
+            self._wakeup.wait(self.poll_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Config version poll failed: {e}", exc_info=True)
+
+    def _apply(self, snapshot: RuntimeConfig):
+        with self._lock:
+            if snapshot.version <= self._current.version:
+                return
+            # `Config` is never written: runtime keys are only read through
+            # runtime_config(), so a reader sees one whole version or the next
+            self._current = snapshot
+        logging.info("Applied config version %d", snapshot.version)
+
+    def _report_version(self):
+        """
+        Records the version this process has applied, in its own transaction.
+        """
+        db = self.db_session_factory()
+        try:
+            self._heartbeat(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _heartbeat(self, db):
+        worker = db.query(ConfigWorker).filter(ConfigWorker.worker_id == self.worker_id).first()
+        if worker is None:
+            worker = ConfigWorker(worker_id=self.worker_id)
+            db.add(worker)
+        now = datetime.now(timezone.utc)
+        worker.version = self._current.version
+        worker.last_seen = now
+
+        # Forget processes that stopped polling long ago (every restart adds a row)
+        cutoff = now - timedelta(hours=Config.CONFIG_WORKER_RETENTION_HOURS)
+        db.query(ConfigWorker).filter(
+            ConfigWorker.last_seen < cutoff,
+            ConfigWorker.worker_id != self.worker_id
+        ).delete(synchronize_session=False)
@@ -0,0 +1,278 @@
+import math
+import string
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from itertools import chain
+from config import Config
+
+_PUNCTUATION = str.maketrans('', '', string.punctuation)
+_MASK_64 = (1 << 64) - 1
+
+# MinHash signature: 16 bins, compared by LSH in 8 bands of 2 bins.
+_BINS = 16
+_BANDS = 8
+_ROWS = _BINS // _BANDS
+
+def tokenize(text: str) -> list:
+    return (text or "").lower().translate(_PUNCTUATION).split()
+
+def token_hashes(tokens: list) -> array:
+    """
+    The sorted, distinct 64-bit hashes of a text's words: its word set in
+    8 bytes per word. Uses Python's per-process string hash, so hashes
+    (and signatures built from them) are only comparable in-process.
+    """
+    return array('Q', sorted({hash(token) & _MASK_64 for token in tokens}))
+
+def minhash(hashes: array) -> array:
+    """
+    One-permutation MinHash over a word set (see `token_hashes`), with
+    rotation densification for empty bins. Each word is hashed once, so
+    the cost is linear in the text length rather than words x permutations.
+
+    The fraction of equal bins between two signatures estimates the
+    Jaccard similarity of their word sets. With 16 bins the estimate is
+    too noisy to decide on by itself (a one-word edit of a three-word
+    text often looks like a match), so it only selects candidates.
+    """
+    bins = [None] * _BINS
+    for h in hashes:
+        index = h % _BINS
+        value = h >> 8
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+
+    signature = array('Q', bytes(8 * _BINS))
+    for index in range(_BINS):
+        if bins[index] is not None:
+            signature[index] = bins[index]
+            continue
+        # Borrow from the next non-empty bin, offset by the distance
+        for distance in range(1, _BINS):
+            value = bins[(index + distance) % _BINS]
+            if value is not None:
+                signature[index] = value + distance
+                break
+    return signature
+
+def similarity(a: array, b: array) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / _BINS
+
+def jaccard(a: array, b: array) -> float:
+    """
+    Exact Jaccard similarity of two word sets from `token_hashes`.
+    """
+    a, b = set(a), set(b)
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+class _Entry:
+    __slots__ = ("created", "signature", "hashes", "band_keys", "ref", "count", "alive")
+
+    def __init__(self, created, signature, hashes, band_keys):
+        self.created = created
+        self.signature = signature
+        self.hashes = hashes  # Word set, to confirm candidates exactly
+        self.band_keys = band_keys
+        self.ref = None  # The original Feedback (object until flushed, then its id)
+        self.count = 0   # Duplicates collapsed into this entry
+        self.alive = True
+
+class MinHashIndex:
+    """
+    LSH index of MinHash signatures over a sliding time window.
+
+    Signatures are split into bands of 2 bins. Each bin that differs can
+    break at most one band, so a match at `min_similarity` must share a
+    known minimum number of whole bands with the query; only entries
+    reaching that count are compared bin by bin, and a candidate that
+    passes is confirmed with the exact Jaccard similarity of the word sets.
+
+    Entries are kept in arrival order, so expiry and the `max_entries`
+    cap both evict from the front in O(1) per entry.
+    """
+    def __init__(self, window_seconds: float, max_entries: int, max_bucket_size: int):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.max_bucket_size = max_bucket_size
+        self._entries = deque()
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def band_keys(scope, signature: array) -> tuple:
+        # Hashed keys keep per-entry memory small; a collision only
+        # adds a candidate, which is then rejected by `similarity`
+        scope_hash = hash(scope)
+        return tuple(
+            hash((scope_hash, band, signature[band * _ROWS], signature[band * _ROWS + 1]))
+            for band in range(_BANDS)
+        )
+
+    def find(self, band_keys: tuple, signature: array, hashes: array, min_similarity: float, now: float):
+        self._expire(now)
+        max_differing_bins = _BINS - math.ceil(min_similarity * _BINS)
+        min_shared_bands = max(1, _BANDS - max_differing_bins)
+
+        band_hits = Counter(chain.from_iterable(
+            self._buckets.get(band_key, ()) for band_key in band_keys
+        ))
+
+        for entry, hits in band_hits.items():
+            if (hits >= min_shared_bands and entry.alive
+                    and similarity(entry.signature, signature) >= min_similarity
+                    and jaccard(entry.hashes, hashes) >= min_similarity):
+                return entry
+        return None
+
+    def add(self, band_keys: tuple, signature: array, hashes: array, now: float) -> _Entry:
+        entry = _Entry(now, signature, hashes, band_keys)
+        self._entries.append(entry)
+        for band_key in entry.band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                bucket = self._buckets[band_key] = deque()
+            bucket.append(entry)
+            if len(bucket) > self.max_bucket_size:
+                bucket.popleft()
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+        return entry
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._entries and self._entries[0].created < cutoff:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry = self._entries.popleft()
+        entry.alive = False
+        # The oldest entry overall is also the oldest in each of its buckets
+        for band_key in entry.band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket and bucket[0] is entry:
+                bucket.popleft()
+            if bucket is not None and not bucket:
+                del self._buckets[band_key]
+
+class DedupResult:
+    """
+    Outcome of checking one message against the near-duplicate indexes.
+    """
+    __slots__ = ("duplicate_of", "scope", "new_entries", "counted")
+
+    def __init__(self, duplicate_of=None, scope=None, new_entries=(), counted=False):
+        self.duplicate_of = duplicate_of
+        self.scope = scope
+        self.new_entries = list(new_entries)
+        self.counted = counted  # Whether the check was added to the stats
+
+    def bind(self, feedback):
+        """Points the entries for a new message at its Feedback row."""
+        for entry in self.new_entries:
+            entry.ref = feedback
+
+class NearDuplicateDetector:
+    """
+    Detects copy-pasted and bot-generated feedback before classification.
+
+    Two scopes are checked, both within one entity (entity_type, entity_id),
+    since a duplicate is collapsed into the original's Feedback row:
+    - per user, for any text, over DEDUP_USER_WINDOW_MINUTES;
+    - across users, for texts of at least DEDUP_GLOBAL_MIN_TOKENS words,
+      over DEDUP_GLOBAL_WINDOW_MINUTES. Short stock phrases such as
+      "great driver" are legitimately repeated, so they are not collapsed
+      across users.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_index = MinHashIndex(
+            Config.DEDUP_USER_WINDOW_MINUTES * 60, Config.DEDUP_MAX_ENTRIES, Config.DEDUP_MAX_BUCKET_SIZE
+        )
+        self._global_index = MinHashIndex(
+            Config.DEDUP_GLOBAL_WINDOW_MINUTES * 60, Config.DEDUP_MAX_ENTRIES, Config.DEDUP_MAX_BUCKET_SIZE
+        )
+        self.checked = 0
+        self.duplicates = {"user": 0, "global": 0}
+
+    def check(self, user_id, entity_type, entity_id, text: str, now: float = None) -> DedupResult:
+        """
+        Looks the text up in both scopes. If it is new, it is indexed and
+        the returned result must be bound to the stored Feedback.
+        """
+        if not Config.DEDUP_ENABLED:
+            return DedupResult()
+
+        tokens = tokenize(text)
+        if not tokens:
+            return DedupResult()
+
+        now = time.time() if now is None else now
+        hashes = token_hashes(tokens)
+        signature = minhash(hashes)
+        min_similarity = Config.DEDUP_SIMILARITY_THRESHOLD
+        use_global = len(tokens) >= Config.DEDUP_GLOBAL_MIN_TOKENS
+        entity = (entity_type, entity_id)
+        user_keys = MinHashIndex.band_keys((user_id, entity), signature)
+        global_keys = MinHashIndex.band_keys(entity, signature) if use_global else None
+
+        with self._lock:
+            self.checked += 1
+
+            match = self._user_index.find(user_keys, signature, hashes, min_similarity, now)
+            scope = "user"
+            if match is None and use_global:
+                match = self._global_index.find(global_keys, signature, hashes, min_similarity, now)
+                scope = "global"
+
+            if match is not None and match.ref is not None:
+                match.count += 1
+                self.duplicates[scope] += 1
+                return DedupResult(duplicate_of=match, scope=scope, counted=True)
+
+            new_entries = [self._user_index.add(user_keys, signature, hashes, now)]
+            if use_global:
+                new_entries.append(self._global_index.add(global_keys, signature, hashes, now))
+            return DedupResult(new_entries=new_entries, counted=True)
+
+    def resolve(self, results: list):
+        """
+        Swaps Feedback objects for their ids once the session has been
+        flushed, so the index never holds on to ORM objects.
+        """
+        with self._lock:
+            for result in results:
+                for entry in result.new_entries:
+                    if entry.ref is not None and not isinstance(entry.ref, int):
+                        entry.ref = entry.ref.id
+
+    def discard(self, results: list):
+        """
+        Forgets entries indexed by a transaction that was rolled back,
+        and takes its checks back out of the stats so a retry is not
+        counted twice.
+        """
+        with self._lock:
+            for result in results:
+                for entry in result.new_entries:
+                    entry.alive = False
+                if result.counted:
+                    self.checked -= 1
+                    if result.duplicate_of is not None:
+                        result.duplicate_of.count -= 1
+                        self.duplicates[result.scope] -= 1
+                    result.counted = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": Config.DEDUP_ENABLED,
+                "checked": self.checked,
+                "duplicates": dict(self.duplicates),
+                "duplicate_rate": sum(self.duplicates.values()) / self.checked if self.checked else 0.0,
+                "indexed": {"user": len(self._user_index), "global": len(self._global_index)}
+            }
@@ -0,0 +1,206 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from typing import Optional
+from bisect import bisect_left, bisect_right
+from models.driver import DriverScore
+from config import Config
+
+# On-disk layout: magic, generated_at (epoch seconds), count, then `count` doubles.
+_HEADER = struct.Struct("<8sdQ")
+_MAGIC = b"SCORSNP1"
+
+
+class ScoreSnapshot:
+    """
+    An immutable, sorted copy of every driver's `average_sentiment_score`.
+    All queries are answered with binary search over the sorted values,
+    so no query ever touches the database.
+    """
+    def __init__(self, scores, generated_at: float, _backing=None):
+        # `scores` is any sorted, indexable sequence of floats
+        # (an `array('d')` or a memoryview over a memory-mapped file).
+        self.scores = scores
+        self.generated_at = generated_at
+        self._backing = _backing  # Keeps the mmap alive as long as the snapshot
+
+    def __len__(self):
+        return len(self.scores)
+
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.generated_at)
+
+    def percentile_rank(self, score: float) -> Optional[float]:
+        """
+        Returns the percentage of the fleet scoring strictly below `score`,
+        or None if the snapshot is empty.
+        """
+        n = len(self.scores)
+        if n == 0:
+            return None
+        return 100.0 * bisect_left(self.scores, score) / n
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Returns the score at quantile `q` (0.0 - 1.0), nearest-rank method,
+        or None if the snapshot is empty.
+        """
+        n = len(self.scores)
+        if n == 0:
+            return None
+        q = max(0.0, min(1.0, q))
+        return self.scores[min(n - 1, int(q * n))]
+
+    def count_between(self, low: float, high: float) -> int:
+        """
+        Returns how many scores fall in the half-open range [low, high).
+        """
+        return bisect_left(self.scores, high) - bisect_left(self.scores, low)
+
+    def histogram(self, bins: int = 10, low: float = 1.0, high: float = 5.0) -> list:
+        """
+        Buckets the fleet into `bins` equal-width bins over [low, high].
+        The last bin is closed so that perfect scores are counted.
+        """
+        width = (high - low) / bins
+        result = []
+        for i in range(bins):
+            start = low + i * width
+            end = low + (i + 1) * width
+            if i == bins - 1:
+                count = bisect_right(self.scores, high) - bisect_left(self.scores, start)
+            else:
+                count = self.count_between(start, end)
+            result.append({"start": round(start, 4), "end": round(end, 4), "count": count})
+        return result
+
+
+class ScoreDistributionService:
+    """
+    Maintains a periodically refreshed snapshot of the fleet score
+    distribution so that analytics requests never have to scan and
+    sort `driver_scores` themselves.
+
+    Optionally persists each snapshot to a memory-mapped file, which
+    lets a restarted process answer queries before its first refresh.
+    """
+    def __init__(self, db_session_factory, refresh_seconds: int = None, snapshot_path: str = None):
+        self.db_session_factory = db_session_factory
+        self.refresh_seconds = refresh_seconds or Config.SCORE_SNAPSHOT_REFRESH_SECONDS
+        self.snapshot_path = snapshot_path if snapshot_path is not None else Config.SCORE_SNAPSHOT_PATH
+        self.is_running = True
+        self.refresh_thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._snapshot = None
+
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                self._snapshot = self._load(self.snapshot_path)
+                logging.info(f"Loaded score snapshot with {len(self._snapshot)} drivers from {self.snapshot_path}")
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable score snapshot {self.snapshot_path}: {e}")
+
+    def start_refresh_thread(self):
+        """
+        Builds a fresh snapshot (a persisted one may be stale or empty)
+        and starts the periodic refresh loop in a new daemon thread.
+        """
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.error(f"Initial score snapshot build failed: {e}", exc_info=True)
+        self.refresh_thread = threading.Thread(target=self.run_refresher, daemon=True)
+        self.refresh_thread.start()
+
+    def stop_refresher(self):
+        """
+        Signals the refresh thread to stop.
+        """
+        self.is_running = False
+        self._wakeup.set()
+
+    def run_refresher(self):
+        # start_refresh_thread() has just built the first snapshot
+        while not self._wakeup.wait(self.refresh_seconds) and self.is_running:
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Score snapshot refresh failed: {e}", exc_info=True)
+
+    def get_snapshot(self) -> ScoreSnapshot:
+        """
+        Returns the current snapshot, building one synchronously if none
+        has been built yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def refresh(self) -> ScoreSnapshot:
+        """
+        Reads all scores in a single query, sorts them once and swaps
+        the new snapshot in. Readers holding the old snapshot are unaffected.
+        """
+        with self._lock:
+            db = self.db_session_factory()
+            try:
+                rows = db.query(DriverScore.average_sentiment_score).all()
+            finally:
+                db.close()
+
+            scores = array('d', sorted(row[0] for row in rows if row[0] is not None))
+            generated_at = time.time()
+
+            if self.snapshot_path:
+                try:
+                    self._persist(self.snapshot_path, scores, generated_at)
+                    snapshot = self._load(self.snapshot_path)
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Could not persist score snapshot to {self.snapshot_path}: {e}")
+                    snapshot = ScoreSnapshot(scores, generated_at)
+            else:
+                snapshot = ScoreSnapshot(scores, generated_at)
+
+            self._snapshot = snapshot
+            return snapshot
+
+    @staticmethod
+    def _persist(path: str, scores: array, generated_at: float):
+        # Write to a temp file of our own and rename it, so readers never see
+        # a partial snapshot and other processes never write into ours
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, generated_at, len(scores)))
+                scores.tofile(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _load(path: str) -> ScoreSnapshot:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError("snapshot file is truncated")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, generated_at, count = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or size != _HEADER.size + count * 8:
+            mapped.close()
+            raise ValueError("snapshot file is corrupt")
+
+        scores = memoryview(mapped)[_HEADER.size:].cast('d')
+        return ScoreSnapshot(scores, generated_at, _backing=mapped)
@@ -0,0 +1,96 @@
+import logging
+import queue
+import threading
+from config import Config
+
+class Subscription:
+    """
+    One subscriber's bounded event buffer.
+    A subscription whose buffer overflows is dropped by the broadcaster
+    rather than allowed to grow without limit.
+    """
+    def __init__(self, driver_ids: set, buffer_size: int):
+        # An empty set means "all drivers"
+        self.driver_ids = driver_ids
+        self.events = queue.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+    def get(self, timeout: float):
+        """
+        Waits for the next event. Returns None on timeout.
+        """
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventBroadcaster:
+    """
+    In-process fan-out of live events (score updates, new alerts) to
+    any number of subscribers, e.g. SSE connections.
+
+    Subscribers can filter by driver_id; publishing only touches the
+    subscribers interested in that driver plus the unfiltered ones.
+    """
+    def __init__(self, buffer_size: int = None, max_subscribers: int = None):
+        self.buffer_size = buffer_size or Config.SSE_CLIENT_BUFFER_SIZE
+        self.max_subscribers = max_subscribers or Config.SSE_MAX_SUBSCRIBERS
+        self._lock = threading.Lock()
+        self._all_drivers = set()
+        self._by_driver = {}
+        self._subscriber_count = 0
+
+    def subscribe(self, driver_ids=None) -> Subscription:
+        """
+        Registers a new subscriber. Returns None if the subscriber limit is reached.
+        """
+        subscription = Subscription(set(driver_ids or ()), self.buffer_size)
+        with self._lock:
+            if self._subscriber_count >= self.max_subscribers:
+                return None
+            self._subscriber_count += 1
+            if not subscription.driver_ids:
+                self._all_drivers.add(subscription)
+            for driver_id in subscription.driver_ids:
+                self._by_driver.setdefault(driver_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._remove(subscription)
+
+    def publish(self, event_type: str, data: dict, driver_id: str = None):
+        """
+        Delivers an event to every matching subscriber without blocking.
+        Subscribers with a full buffer are dropped.
+        """
+        event = {"type": event_type, "data": data}
+        with self._lock:
+            targets = list(self._all_drivers)
+            if driver_id is not None:
+                targets.extend(self._by_driver.get(driver_id, ()))
+
+            for subscription in targets:
+                try:
+                    subscription.events.put_nowait(event)
+                except queue.Full:
+                    logging.warning("Dropping slow event stream subscriber (buffer full)")
+                    subscription.dropped = True
+                    self._remove(subscription)
+
+    def subscriber_count(self) -> int:
+        return self._subscriber_count
+
+    def _remove(self, subscription: Subscription):
+        # Caller must hold self._lock
+        removed = subscription in self._all_drivers
+        self._all_drivers.discard(subscription)
+        for driver_id in subscription.driver_ids:
+            subscribers = self._by_driver.get(driver_id)
+            if subscribers and subscription in subscribers:
+                removed = True
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_driver[driver_id]
+        if removed:
+            self._subscriber_count -= 1
@@ -1,23 +1,26 @@
 import logging
 import time
 import threading # <-- 1. Add this import
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.feedback import Feedback, FeedbackEntityType
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from config import Config
+from services.config_store import pinned_config
 
 class FeedbackProcessor:
     """
     The main worker class. It pulls from the queue and uses
     the various services to process and store feedback.
     """
-    def __init__(self, db_session_factory, queue_service, sentiment_service, scoring_service, alerting_service):
+    def __init__(self, db_session_factory, queue_service, sentiment_service, scoring_service, alerting_service, event_broadcaster=None, dedup_service=None, alert_dispatcher=None):
         self.db_session_factory = db_session_factory
         self.queue_service = queue_service
         self.sentiment_service = sentiment_service
         self.scoring_service = scoring_service
         self.alerting_service = alerting_service
+        self.event_broadcaster = event_broadcaster
+        self.dedup_service = dedup_service
+        self.alert_dispatcher = alert_dispatcher
         self.is_running = True
         self.worker_thread = None # <-- 2. Add a property to hold the thread
 
@@ -39,86 +42,239 @@ class FeedbackProcessor:
     def run_worker(self):
         """
         The main loop for the worker thread.
-        Continuously pulls tasks from the queue and processes them.
+        Continuously pulls batches of tasks from the queue and processes them.
         """
         logging.info("Feedback worker is running...")
         while self.is_running:
+            batch = []
             try:
-                # This blocks until an item is available
-                feedback_data = self.queue_service.get()
-                
-                # Process the message
-                self.process_message(feedback_data)
+                # This blocks until at least one item is available
+                batch = self.queue_service.get_batch(Config.PROCESSOR_BATCH_SIZE)
                 
-                # Signal to the queue that task is done
-                self.queue_service.task_done()
+                # Process the messages
+                self.process_batch(batch)
                 
             except Exception as e:
                 # Handle potential-poison-pill messages or DB errors
-                logging.error(f"Error processing message: {feedback_data}. Error: {e}", exc_info=True)
+                logging.error(f"Error processing batch: {batch}. Error: {e}", exc_info=True)
                 # In prod, we'd move this to a dead-letter queue
+
+            finally:
+                # Signal to the queue that each task is done
+                for _ in batch:
+                    self.queue_service.task_done()
                 
     def process_message(self, feedback_data: dict):
         """
-        Processes a single feedback message.
+        Processes a single feedback message in its own transaction.
+        """
+        self.process_batch([feedback_data])
+
+    def process_batch(self, batch: list):
+        """
+        Processes a batch of feedback messages.
         This includes sentiment analysis, saving, scoring, and alerting
-        within a single database transaction.
+        within a single database transaction. Sentiment is classified
+        with one `classify_many` call, and entity aggregates are computed
+        once, over the whole batch.
+
+        The whole batch reads one pinned config version. If the batch
+        fails, it is retried one message at a time so a single bad
+        message cannot drop the others.
         """
-        logging.info(f"Processing feedback for: {feedback_data.get('entity_type')}:{feedback_data.get('entity_id')}")
-        
+        with pinned_config():
+            self._process_batch(batch)
+
+    def _process_batch(self, batch: list):
         db: Session = self.db_session_factory()
+        dedup_results = []
+        # Negative-rate windows touched by this batch, restored on rollback
+        tracker_journal = {}
         
         try:
-            raw_text = feedback_data.get('text', '')
-            entity_type_str = feedback_data.get('entity_type')
-            entity_id = feedback_data.get('entity_id')
-            user_id = feedback_data.get('user_id')
+            scored_feedback = []
+            # Live events are only published once the batch has committed
+            pending_events = []
+            stored_keys = self._stored_idempotency_keys(db, batch)
 
-            # 1. Get Sentiment Score
-            sentiment_score = self.sentiment_service.classify(raw_text)
-            
-            # 2. Save the raw feedback log
-            feedback_log = Feedback(
-                user_id=user_id,
-                entity_type=FeedbackEntityType(entity_type_str),
-                entity_id=entity_id,
-                text=raw_text,
-                sentiment_score=sentiment_score
-            )
-            
-            # If it's driver feedback, link it to the driver model
-            if entity_type_str == FeedbackEntityType.DRIVER.value:
-                feedback_log.driver_id = entity_id
+            new_feedback = []
 
-            db.add(feedback_log)
+            for feedback_data in batch:
+                # Lazy %-formatting: rate-limited lines cost almost nothing when dropped
+                logging.info("Processing feedback for: %s:%s", feedback_data.get('entity_type'), feedback_data.get('entity_id'))
 
-            # 3. Update driver score and check alerts (if it's driver feedback)
-            if entity_type_str == FeedbackEntityType.DRIVER.value:
-                
-                # This performs the atomic read-lock-update
-                new_avg_score = self.scoring_service.update_driver_score(
-                    db=db,
-                    driver_id=entity_id,
-                    new_feedback_score=sentiment_score
+                raw_text = feedback_data.get('text', '')
+                entity_type = FeedbackEntityType(feedback_data.get('entity_type'))
+                entity_id = feedback_data.get('entity_id')
+                user_id = feedback_data.get('user_id')
+                idempotency_key = feedback_data.get('idempotency_key')
+
+                # Retries that reached another API process, or arrived after
+                # a restart, were queued again; keep only the first copy
+                if idempotency_key:
+                    if idempotency_key in stored_keys:
+                        logging.info("Skipping already stored feedback (idempotency key %s)", idempotency_key)
+                        continue
+                    stored_keys.add(idempotency_key)
+
+                # 0. Collapse near-duplicates before doing any real work
+                if self.dedup_service:
+                    dedup = self.dedup_service.check(user_id, entity_type, entity_id, raw_text)
+                    dedup_results.append(dedup)
+                    if dedup.duplicate_of is not None:
+                        self._collapse_duplicate(db, dedup.duplicate_of.ref)
+                        continue
+
+                # 1. Build the raw feedback log; it is scored below, with the rest of the batch
+                feedback_log = Feedback(
+                    user_id=user_id,
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    text=raw_text,
+                    duplicate_count=0,
+                    idempotency_key=idempotency_key
                 )
                 
-                # This checks score and throttling
-                self.alerting_service.check_and_raise_alert(
-                    db=db,
-                    driver_id=entity_id,
-                    new_score=new_avg_score
-                )
+                # If it's driver feedback, link it to the driver model
+                if entity_type == FeedbackEntityType.DRIVER:
+                    feedback_log.driver_id = entity_id
+
+                # Later near-duplicates in this batch collapse into this object
+                if self.dedup_service:
+                    dedup.bind(feedback_log)
+                new_feedback.append(feedback_log)
+
+            # 2. Get Sentiment Scores for every message that is kept, in one
+            # call (one cache lookup and one model call for the whole batch)
+            sentiment_scores = self.sentiment_service.classify_many(
+                [feedback_log.text for feedback_log in new_feedback]
+            ) if new_feedback else []
+
+            for feedback_log, sentiment_score in zip(new_feedback, sentiment_scores):
+                entity_type = feedback_log.entity_type
+                entity_id = feedback_log.entity_id
+
+                # Save the raw feedback log
+                feedback_log.sentiment_score = sentiment_score
+                db.add(feedback_log)
+
+                # 3. Update driver score and check alerts (if it's driver feedback)
+                if entity_type == FeedbackEntityType.DRIVER:
+                    
+                    # This performs the atomic read-lock-update
+                    new_avg_score = self.scoring_service.update_driver_score(
+                        db=db,
+                        driver_id=entity_id,
+                        new_feedback_score=sentiment_score
+                    )
+                    
+                    # This checks score and throttling
+                    raised_alerts = self.alerting_service.check_and_raise_alert(
+                        db=db,
+                        driver_id=entity_id,
+                        new_score=new_avg_score,
+                        feedback_score=sentiment_score,
+                        journal=tracker_journal
+                    )
+
+                    # Flush so later messages in this batch see the new
+                    # score row and any alert that was just logged
+                    db.flush()
+
+                    pending_events.append(("score", entity_id, {
+                        "driver_id": entity_id,
+                        "score": new_avg_score,
+                        "feedback_score": sentiment_score
+                    }))
+                    for alert in raised_alerts:
+                        pending_events.append(("alert", entity_id, {
+                            "alert_id": alert.id,
+                            "driver_id": entity_id,
+                            "rule": alert.rule,
+                            "value": alert.score_at_alert,
+                            "threshold": alert.threshold_at_alert
+                        }))
+
+                scored_feedback.append((entity_type, entity_id, sentiment_score))
+
+            # 4. Update generic aggregates for every entity in the batch
+            self.scoring_service.update_entity_scores(db=db, scored_feedback=scored_feedback)
             
-            # 4. Commit the transaction
-            # All or nothing: save feedback, update score, log alert
+            # 5. Commit the transaction
+            # All or nothing: save feedback, update scores, log alerts
+            if self.dedup_service:
+                # Assign ids so the dedup index can refer to the new rows
+                db.flush()
+                self.dedup_service.resolve(dedup_results)
             db.commit()
-            logging.info(f"Successfully processed feedback for {entity_id}")
 
         except Exception as e:
             # If *any* part fails, roll back everything
-            logging.error(f"Transaction failed for feedback: {feedback_data}. Rolling back. Error: {e}", exc_info=True)
             db.rollback()
+            self.alerting_service.discard(tracker_journal)
+            if self.dedup_service:
+                self.dedup_service.discard(dedup_results)
+            if len(batch) > 1:
+                logging.warning(f"Batch of {len(batch)} failed, retrying messages individually. Error: {e}")
+                db.close()
+                for feedback_data in batch:
+                    self.process_batch([feedback_data])
+                return
+            if (isinstance(e, IntegrityError) and batch[0].get('idempotency_key')
+                    and self._stored_idempotency_keys(db, batch)):
+                # Another worker stored the same submission concurrently. Any
+                # other constraint failure takes the normal failure path below
+                logging.info("Dropped duplicate feedback (idempotency key %s)", batch[0]['idempotency_key'])
+                return
+            logging.error(f"Transaction failed for feedback: {batch[0]}. Rolling back. Error: {e}", exc_info=True)
+            return
             
         finally:
             # Always close the session
-            db.close()
\ No newline at end of file
+            db.close()
+
+        # Past this point the batch is committed: nothing below may send it
+        # back through the retry path, or its aggregates would be applied twice
+        logging.info("Successfully processed %d feedback message(s)", len(batch))
+        try:
+            self._publish_committed(pending_events)
+        except Exception as e:
+            logging.error(f"Failed to publish events for a committed batch: {e}", exc_info=True)
+
+    def _publish_committed(self, pending_events: list):
+        """
+        Publishes the live events of a committed batch and wakes the
+        alert dispatcher if it raised any alerts.
+        """
+        if self.event_broadcaster:
+            for event_type, driver_id, data in pending_events:
+                self.event_broadcaster.publish(event_type, data, driver_id=driver_id)
+
+        # Deliver the alerts' outbox rows now rather than at the next poll
+        if self.alert_dispatcher and any(event[0] == "alert" for event in pending_events):
+            self.alert_dispatcher.wake()
+
+    def _stored_idempotency_keys(self, db: Session, batch: list) -> set:
+        """
+        Returns the batch's idempotency keys that are already stored,
+        in one indexed lookup.
+        """
+        keys = {data.get('idempotency_key') for data in batch if data.get('idempotency_key')}
+        if not keys:
+            return set()
+        rows = db.query(Feedback.idempotency_key).filter(Feedback.idempotency_key.in_(keys)).all()
+        return {row[0] for row in rows}
+
+    def _collapse_duplicate(self, db: Session, original):
+        """
+        Counts a near-duplicate against the original feedback instead of
+        storing it. `original` is a Feedback id, or a Feedback object
+        still pending in this batch.
+        """
+        if isinstance(original, int):
+            db.query(Feedback).filter(Feedback.id == original).update(
+                {Feedback.duplicate_count: Feedback.duplicate_count + 1},
+                synchronize_session=False
+            )
+        else:
+            original.duplicate_count += 1
\ No newline at end of file
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from config import Config
+
+class IdempotencyIndex:
+    """
+    Bounded, TTL-evicted set of idempotency keys already accepted.
+
+    Keys are kept as 64-bit digests in a ring of generations: a new set
+    is started every TTL / `generations` seconds, or sooner once the
+    current one holds `max_keys / generations` keys. Expiry drops a whole
+    generation at once, and when more than `max_keys` are held the
+    oldest generation goes first, so a burst cannot grow the index past
+    `max_keys`. Add and lookup stay O(1) and each key costs roughly 90
+    bytes. Unless evicted, a key lives between TTL and TTL + one slice.
+
+    The index is only a fast path: the unique `feedbacks.idempotency_key`
+    column still rejects a repeat that arrives after a restart or eviction.
+    """
+    def __init__(self, ttl_seconds: float = None, max_keys: int = None, generations: int = 24):
+        self.ttl_seconds = ttl_seconds or Config.IDEMPOTENCY_TTL_HOURS * 3600
+        self.max_keys = max_keys or Config.IDEMPOTENCY_MAX_KEYS
+        self.slice_seconds = self.ttl_seconds / generations
+        self.generation_size = max(1, self.max_keys // generations)
+        # (slice start, set of digests), oldest first
+        self._generations = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def contains(self, key: str, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        digest = self._digest(key)
+        with self._lock:
+            self._expire(now)
+            return any(digest in keys for _, keys in self._generations)
+
+    def add(self, key: str, now: float = None) -> bool:
+        """
+        Records a key. Returns False if it was already present, so that
+        two concurrent retries cannot both be accepted.
+        """
+        now = time.time() if now is None else now
+        digest = self._digest(key)
+        with self._lock:
+            self._expire(now)
+            if any(digest in keys for _, keys in self._generations):
+                return False
+            if (not self._generations or now - self._generations[-1][0] >= self.slice_seconds
+                    or len(self._generations[-1][1]) >= self.generation_size):
+                self._generations.append((now, set()))
+            self._generations[-1][1].add(digest)
+            self._size += 1
+            while self._size > self.max_keys and len(self._generations) > 1:
+                self._size -= len(self._generations.popleft()[1])
+            return True
+
+    def discard(self, key: str):
+        """
+        Forgets a key whose submission could not be queued, so the
+        client's retry is accepted.
+        """
+        digest = self._digest(key)
+        with self._lock:
+            for _, keys in self._generations:
+                if digest in keys:
+                    keys.remove(digest)
+                    self._size -= 1
+                    return
+
+    def __len__(self):
+        return self._size
+
+    def _expire(self, now: float):
+        # Caller must hold self._lock
+        while self._generations and self._generations[0][0] + self.ttl_seconds + self.slice_seconds <= now:
+            self._size -= len(self._generations.popleft()[1])
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from services.config_store import runtime_config
+
+class CountWindow:
+    """
+    Ring buffer over the last `size` feedback scores of one driver.
+    Stores one byte per slot and keeps a running negative count,
+    so recording and reading the rate are both O(1).
+    """
+    __slots__ = ("slots", "position", "filled", "negatives")
+
+    def __init__(self, size: int):
+        self.slots = bytearray(size)
+        self.position = 0
+        self.filled = 0
+        self.negatives = 0
+
+    def record(self, is_negative: bool, now: float):
+        size = len(self.slots)
+        if self.filled == size:
+            # Evict the oldest entry we are about to overwrite
+            self.negatives -= self.slots[self.position]
+        else:
+            self.filled += 1
+        self.slots[self.position] = 1 if is_negative else 0
+        self.negatives += self.slots[self.position]
+        self.position = (self.position + 1) % size
+
+    def counts(self, now: float) -> tuple:
+        return self.filled, self.negatives
+
+    def copy(self):
+        window = CountWindow.__new__(CountWindow)
+        window.slots = bytearray(self.slots)
+        window.position = self.position
+        window.filled = self.filled
+        window.negatives = self.negatives
+        return window
+
+class TimeWindow:
+    """
+    Time-bucketed counters over the last `minutes` of one driver's feedback.
+    The window is split into a fixed number of buckets that are recycled
+    as time moves on, so memory and per-message cost stay constant.
+    """
+    __slots__ = ("bucket_seconds", "bucket_ids", "totals", "negatives")
+
+    def __init__(self, minutes: float, buckets: int):
+        self.bucket_seconds = (minutes * 60.0) / buckets
+        self.bucket_ids = [-1] * buckets
+        self.totals = [0] * buckets
+        self.negatives = [0] * buckets
+
+    def record(self, is_negative: bool, now: float):
+        bucket_id = int(now // self.bucket_seconds)
+        index = bucket_id % len(self.bucket_ids)
+        if self.bucket_ids[index] != bucket_id:
+            # This slot still holds an expired bucket; recycle it
+            self.bucket_ids[index] = bucket_id
+            self.totals[index] = 0
+            self.negatives[index] = 0
+        self.totals[index] += 1
+        if is_negative:
+            self.negatives[index] += 1
+
+    def counts(self, now: float) -> tuple:
+        oldest_live = int(now // self.bucket_seconds) - len(self.bucket_ids)
+        total = negatives = 0
+        for index, bucket_id in enumerate(self.bucket_ids):
+            if bucket_id > oldest_live:
+                total += self.totals[index]
+                negatives += self.negatives[index]
+        return total, negatives
+
+    def copy(self):
+        window = TimeWindow.__new__(TimeWindow)
+        window.bucket_seconds = self.bucket_seconds
+        window.bucket_ids = list(self.bucket_ids)
+        window.totals = list(self.totals)
+        window.negatives = list(self.negatives)
+        return window
+
+class NegativeRateTracker:
+    """
+    Tracks, per driver, the share of negative scores over a recent window
+    (the last N feedbacks, or the last T minutes if configured).
+
+    Windows live only in memory. At most `NEGATIVE_RATE_MAX_TRACKED_DRIVERS`
+    windows are kept; the least recently updated driver is evicted first.
+    Windows are reset whenever the window configuration changes.
+
+    Records made inside a DB transaction should pass a `journal` dict,
+    so they can be undone with `restore()` if the transaction rolls back
+    (otherwise a retried batch would count its feedback twice).
+    """
+    TIME_WINDOW_BUCKETS = 12
+
+    def __init__(self):
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self._window_config = None
+
+    def record(self, driver_id: str, score: float, now: float = None, journal: dict = None) -> tuple:
+        """
+        Records one feedback score for a driver. If `journal` is given,
+        the driver's window is saved in it before its first change.
+
+        Returns:
+            A (sample_count, negative_rate) tuple for the driver's current window.
+        """
+        now = time.time() if now is None else now
+        is_negative = score <= Config.NEGATIVE_SCORE_THRESHOLD
+        config = runtime_config()
+
+        with self._lock:
+            window_config = (config.NEGATIVE_RATE_WINDOW_SIZE, config.NEGATIVE_RATE_WINDOW_MINUTES)
+            if window_config != self._window_config:
+                self._windows.clear()
+                self._window_config = window_config
+
+            window = self._windows.get(driver_id)
+            if journal is not None and driver_id not in journal:
+                journal[driver_id] = (window_config, window.copy() if window is not None else None)
+            if window is None:
+                window = self._new_window(*window_config)
+                self._windows[driver_id] = window
+                while len(self._windows) > Config.NEGATIVE_RATE_MAX_TRACKED_DRIVERS:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(driver_id)
+
+            window.record(is_negative, now)
+            total, negatives = window.counts(now)
+
+        return total, (negatives / total if total else 0.0)
+
+    def restore(self, journal: dict):
+        """
+        Puts back the windows saved in `journal`, undoing every record
+        made with it.
+        """
+        with self._lock:
+            for driver_id, (window_config, window) in journal.items():
+                if window_config != self._window_config:
+                    # The windows have been reset since; nothing to undo
+                    continue
+                if window is None:
+                    self._windows.pop(driver_id, None)
+                else:
+                    self._windows[driver_id] = window
+        journal.clear()
+
+    def tracked_drivers(self) -> int:
+        return len(self._windows)
+
+    def _new_window(self, window_size: int, window_minutes: float):
+        if window_minutes:
+            return TimeWindow(window_minutes, self.TIME_WINDOW_BUCKETS)
+        return CountWindow(window_size)
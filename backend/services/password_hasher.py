@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import Config
+
+class PasswordHasherBusy(Exception):
+    """Raised when bcrypt work cannot start or finish in time."""
+    pass
+
+class PasswordHasher:
+    """
+    Runs bcrypt work (hashing and checking passwords) on a small, bounded
+    thread pool instead of on every request thread at once.
+
+    At most `max_workers` bcrypt calls run concurrently, at most
+    `max_pending` may wait behind them, and a caller gives up after
+    `timeout` seconds. A login burst then degrades into fast 503s
+    instead of every server thread grinding through bcrypt together.
+    """
+    def __init__(self, max_workers: int = None, max_pending: int = None, timeout: float = None):
+        max_workers = max_workers or Config.BCRYPT_MAX_WORKERS
+        max_pending = max_pending if max_pending is not None else Config.BCRYPT_MAX_PENDING
+        self.timeout = timeout or Config.BCRYPT_TIMEOUT_SECONDS
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def run(self, fn, *args):
+        """
+        Runs `fn(*args)` (e.g. `user.check_password`) on the bcrypt pool
+        and waits for the result.
+
+        Raises:
+            PasswordHasherBusy: if the pool is saturated or the call times out.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password operations in progress")
+
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # The slot is released when the work finally completes
+            future.cancel()
+            raise PasswordHasherBusy("Password operation timed out")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,115 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+class RateLimitResult:
+    """
+    Outcome of a single rate-limit check, with the values needed for
+    the `X-RateLimit-*` response headers.
+    """
+    __slots__ = ("allowed", "limit", "remaining", "reset_seconds", "retry_after_seconds")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset_seconds: int, retry_after_seconds: int):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_seconds = reset_seconds
+        self.retry_after_seconds = retry_after_seconds
+
+    def headers(self) -> dict:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset_seconds)
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after_seconds)
+        return headers
+
+class TokenBucketLimiter:
+    """
+    In-memory token-bucket rate limiter.
+
+    Each key (e.g. a user id plus entity type) has a bucket of up to
+    `burst` tokens that refills at `rate_per_minute`. A check refills
+    lazily and takes one token, so it is O(1).
+
+    Buckets are kept in least-recently-used order. A bucket that has been
+    idle long enough to refill completely is the same as a new bucket,
+    so it is evicted. `max_buckets` is a hard cap on top of that.
+    """
+    def __init__(self, max_buckets: int = None):
+        self.max_buckets = max_buckets or Config.RATE_LIMIT_MAX_BUCKETS
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key, rate_per_minute: float, burst: int, now: float = None) -> RateLimitResult:
+        """
+        Takes one token from the bucket for `key` if one is available.
+        """
+        return self.check_all([key], rate_per_minute, burst, now)
+
+    def check_all(self, keys: list, rate_per_minute: float, burst: int, now: float = None) -> RateLimitResult:
+        """
+        Takes one token from every bucket in `keys` (e.g. the user's and
+        the client IP's) only if all of them have one, so a request that
+        one limit rejects costs nothing against the others.
+
+        Returns the result for the most restrictive bucket.
+        """
+        now = time.monotonic() if now is None else now
+        rate_per_second = rate_per_minute / 60.0
+
+        with self._lock:
+            buckets = []
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    # [tokens, last_refill, full_at]
+                    bucket = [float(burst), now, now]
+                    self._buckets[key] = bucket
+                else:
+                    bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate_per_second)
+                    bucket[1] = now
+                    self._buckets.move_to_end(key)
+                buckets.append(bucket)
+
+            allowed = all(bucket[0] >= 1.0 for bucket in buckets)
+            for bucket in buckets:
+                if allowed:
+                    bucket[0] -= 1.0
+                bucket[2] = now + self._seconds_until(burst - bucket[0], rate_per_second)
+            tokens = min(bucket[0] for bucket in buckets)
+            reset_seconds = max(bucket[2] for bucket in buckets) - now
+            self._evict(now)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=burst,
+            remaining=int(tokens),
+            reset_seconds=math.ceil(reset_seconds),
+            retry_after_seconds=0 if allowed else math.ceil(self._seconds_until(1.0 - tokens, rate_per_second))
+        )
+
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+    @staticmethod
+    def _seconds_until(tokens_needed: float, rate_per_second: float) -> float:
+        if tokens_needed <= 0:
+            return 0.0
+        if rate_per_second <= 0:
+            return 60.0
+        return tokens_needed / rate_per_second
+
+    def _evict(self, now: float):
+        # Caller must hold self._lock. Buckets are in least-recently-used
+        # order, so the front is checked until one is still refilling.
+        while self._buckets:
+            oldest_key = next(iter(self._buckets))
+            if len(self._buckets) > self.max_buckets or now >= self._buckets[oldest_key][2]:
+                del self._buckets[oldest_key]
+            else:
+                break
@@ -1,13 +1,185 @@
+import json
+from abc import ABC, abstractmethod
+from collections import defaultdict
 from sqlalchemy.orm import Session
 from models.driver import Driver, DriverScore
+from models.entity_score import EntityScore
 from config import Config
+from services.config_store import runtime_config
+
+class Aggregator(ABC):
+    """
+    Abstract Base Class (Interface) for an incremental aggregator.
+    An aggregator folds scores into a small JSON-serializable state,
+    one score at a time, so it never needs to re-read raw feedback.
+    """
+    name = None
+
+    @abstractmethod
+    def initial_state(self) -> dict:
+        """Return the state for an entity with no feedback yet."""
+        pass
+
+    @abstractmethod
+    def update(self, state: dict, score: float) -> dict:
+        """Fold a single score into the state and return it."""
+        pass
+
+    @abstractmethod
+    def value(self, state: dict) -> float:
+        """Return the aggregated value for the given state."""
+        pass
+
+class EmaAggregator(Aggregator):
+    """
+    Exponential Moving Average, using the runtime `EMA_ALPHA`.
+    """
+    name = "ema"
+
+    def initial_state(self):
+        return {"ema": None}
+
+    def update(self, state, score):
+        if state["ema"] is None:
+            state["ema"] = score  # First score is the average
+        else:
+            alpha = runtime_config().EMA_ALPHA
+            state["ema"] = (score * alpha) + (state["ema"] * (1 - alpha))
+        return state
+
+    def value(self, state):
+        return state["ema"]
+
+class WindowedMeanAggregator(Aggregator):
+    """
+    Mean of the last `window_size` scores, kept with a running sum.
+    """
+    name = "windowed_mean"
+
+    def __init__(self, window_size: int = None):
+        self.window_size = window_size or Config.AGGREGATION_WINDOW_SIZE
+
+    def initial_state(self):
+        return {"values": [], "sum": 0.0}
+
+    def update(self, state, score):
+        state["values"].append(score)
+        state["sum"] += score
+        if len(state["values"]) > self.window_size:
+            state["sum"] -= state["values"].pop(0)
+        return state
+
+    def value(self, state):
+        if not state["values"]:
+            return None
+        return state["sum"] / len(state["values"])
+
+class CountAggregator(Aggregator):
+    """
+    Total number of feedback entries seen.
+    """
+    name = "count"
+
+    def initial_state(self):
+        return {"count": 0}
+
+    def update(self, state, score):
+        state["count"] += 1
+        return state
+
+    def value(self, state):
+        return float(state["count"])
+
+class NegativeRateAggregator(Aggregator):
+    """
+    Share of all feedback scoring at or below `Config.NEGATIVE_SCORE_THRESHOLD`.
+    """
+    name = "negative_rate"
+
+    def initial_state(self):
+        return {"count": 0, "negative": 0}
+
+    def update(self, state, score):
+        state["count"] += 1
+        if score <= Config.NEGATIVE_SCORE_THRESHOLD:
+            state["negative"] += 1
+        return state
+
+    def value(self, state):
+        if not state["count"]:
+            return None
+        return state["negative"] / state["count"]
+
+def default_aggregators() -> list:
+    return [EmaAggregator(), WindowedMeanAggregator(), CountAggregator(), NegativeRateAggregator()]
 
 class ScoringService:
     """
-    Handles the logic for updating a driver's score.
-    Uses an Exponential Moving Average (EMA) for real-time updates.
+    Handles the logic for updating entity scores.
+    Driver scores use an Exponential Moving Average (EMA) for real-time
+    updates; every entity type is also run through a set of pluggable
+    aggregators stored in `entity_scores`.
     """
-    
+    def __init__(self, aggregators: list = None):
+        self.aggregators = aggregators if aggregators is not None else default_aggregators()
+
+    def update_entity_scores(self, db: Session, scored_feedback: list) -> dict:
+        """
+        Runs every aggregator over a batch of scored feedback in a single pass.
+
+        `scored_feedback` is a list of (entity_type, entity_id, score)
+        tuples, where entity_type is a `FeedbackEntityType`. Existing rows
+        for all entities in the batch are locked and loaded with one query.
+
+        This function MUST be called within an active DB session.
+
+        Returns:
+            A dict of {(entity_type, entity_id): {aggregator_name: value}}.
+        """
+        if not scored_feedback or not self.aggregators:
+            return {}
+
+        # Group scores per entity, preserving arrival order
+        scores_by_entity = defaultdict(list)
+        for entity_type, entity_id, score in scored_feedback:
+            scores_by_entity[(entity_type, entity_id)].append(score)
+
+        entity_types = {key[0] for key in scores_by_entity}
+        entity_ids = {key[1] for key in scores_by_entity}
+        rows = db.query(EntityScore).filter(
+            EntityScore.entity_type.in_(entity_types),
+            EntityScore.entity_id.in_(entity_ids)
+        ).with_for_update().all()
+        existing = {(row.entity_type, row.entity_id, row.aggregator): row for row in rows}
+
+        results = {}
+        for (entity_type, entity_id), scores in scores_by_entity.items():
+            values = {}
+            for aggregator in self.aggregators:
+                row = existing.get((entity_type, entity_id, aggregator.name))
+                if row is None:
+                    row = EntityScore(
+                        entity_type=entity_type,
+                        entity_id=entity_id,
+                        aggregator=aggregator.name
+                    )
+                    db.add(row)
+                    state = aggregator.initial_state()
+                else:
+                    state = json.loads(row.state)
+
+                for score in scores:
+                    state = aggregator.update(state, score)
+
+                row.state = json.dumps(state)
+                row.value = aggregator.value(state)
+                values[aggregator.name] = row.value
+
+            results[(entity_type, entity_id)] = values
+
+        # The session commit is handled by the FeedbackProcessor
+        return results
+
     def update_driver_score(self, db: Session, driver_id: str, new_feedback_score: float) -> float:
         """
         Updates a driver's score using an atomic DB transaction.
@@ -48,7 +220,7 @@ class ScoringService:
             # This driver already has a score, update it using EMA
             
             old_ema = driver_score.average_sentiment_score
-            alpha = Config.EMA_ALPHA
+            alpha = runtime_config().EMA_ALPHA
             
             # The EMA formula
             new_ema = (new_feedback_score * alpha) + (old_ema * (1 - alpha))
@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+class CachedSentimentService:
+    """
+    Content-addressed result cache in front of a sentiment service.
+
+    A result is keyed by a digest of the classifier's `version` and the
+    normalized text, so "Great driver!" and "great driver" share one entry
+    and a new lexicon or model version never reads an old result. Keys
+    live in two tiers:
+    - an in-memory LRU of `max_entries` results, and
+    - optionally a SQLite file (`path`), shared by restarts, backfills
+      and re-drives. Rows from other versions are purged when the
+      version changes.
+
+    Each entry remembers how long its classification took, so hits can
+    report the time they saved. Exposes the wrapped service's interface
+    (`classify`, `classify_many`, `normalize`, `version`).
+    """
+    # SQLite's default limit on bound parameters is 999
+    LOOKUP_CHUNK_SIZE = 500
+
+    def __init__(self, service, max_entries: int = None, path: str = None):
+        self.service = service
+        self.max_entries = max_entries or Config.SENTIMENT_CACHE_SIZE
+        self.path = path if path is not None else Config.SENTIMENT_CACHE_PATH
+        # key -> (score, classify seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0,
+                       "time_saved_seconds": 0.0, "classify_seconds": 0.0, "invalidations": 0}
+
+        self._db = None
+        if self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment_results ("
+                "key BLOB PRIMARY KEY, version TEXT NOT NULL, score REAL NOT NULL, cost REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @property
+    def version(self) -> str:
+        return self.service.version
+
+    def normalize(self, text: str) -> str:
+        normalize = getattr(self.service, "normalize", None)
+        return normalize(text) if normalize else " ".join(text.split())
+
+    def classify(self, text: str) -> float:
+        return self.classify_many([text])[0]
+
+    def classify_many(self, texts: list) -> list:
+        """
+        Classifies many texts with one memory pass, one batched SQLite
+        lookup and one call to the wrapped service for the misses.
+        """
+        version = self._current_version()
+        keys = [self._key(version, text) for text in texts]
+        found = self._lookup(version, keys)
+
+        # Classify each distinct missing text once
+        missing = OrderedDict()
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            start = time.perf_counter()
+            scores = self.service.classify_many(list(missing.values()))
+            cost = (time.perf_counter() - start) / len(missing)
+            computed = {key: (score, cost) for key, score in zip(missing, scores)}
+            # Repeats of a missing text within the batch were served by its one classification
+            repeats = sum(1 for key in keys if key in missing) - len(missing)
+            self._store(version, computed, repeats)
+            found.update(computed)
+
+        return [found[key][0] for key in keys]
+
+    def lookup_many(self, texts: list) -> dict:
+        """
+        Returns {text: score} for the texts that are already cached,
+        without classifying the rest.
+        """
+        version = self._current_version()
+        keys = {self._key(version, text): text for text in texts}
+        found = self._lookup(version, list(keys))
+        with self._lock:
+            self._stats["misses"] += len(keys) - len(found)
+        return {keys[key]: score for key, (score, _) in found.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["persistent_hits"]) / lookups if lookups else None
+        stats["version"] = self._version
+        stats["persistent"] = self.path
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    def _key(self, version: str, text: str) -> bytes:
+        normalized = self.normalize(text or "")
+        return hashlib.blake2b(f"{version}\0{normalized}".encode('utf-8'), digest_size=16).digest()
+
+    def _current_version(self) -> str:
+        """
+        Returns the classifier version, dropping every cached result the
+        first time a new version is seen.
+        """
+        version = self.service.version
+        if version == self._version:
+            return version
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._stats["invalidations"] += 1
+                    logging.info("Sentiment classifier changed to %s, invalidating cached results", version)
+                self._entries.clear()
+                if self._db is not None:
+                    self._db.execute("DELETE FROM sentiment_results WHERE version != ?", (version,))
+                    self._db.commit()
+                self._version = version
+        return version
+
+    def _lookup(self, version: str, keys: list) -> dict:
+        """
+        Returns {key: (score, cost)} for the cached keys, promoting
+        persistent hits into the memory tier.
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = entry
+                    self._stats["memory_hits"] += 1
+                    self._stats["time_saved_seconds"] += entry[1]
+
+            remaining = {key for key in keys if key not in found}
+            if remaining and self._db is not None:
+                persistent = list(remaining)
+                for start in range(0, len(persistent), self.LOOKUP_CHUNK_SIZE):
+                    chunk = persistent[start:start + self.LOOKUP_CHUNK_SIZE]
+                    rows = self._db.execute(
+                        f"SELECT key, score, cost FROM sentiment_results WHERE version = ? "
+                        f"AND key IN ({','.join('?' * len(chunk))})",
+                        (version, *chunk)
+                    ).fetchall()
+                    for key, score, cost in rows:
+                        found[key] = (score, cost)
+                        self._remember(key, (score, cost))
+                for key in keys:
+                    if key in found and key in remaining:
+                        self._stats["persistent_hits"] += 1
+                        self._stats["time_saved_seconds"] += found[key][1]
+        return found
+
+    def _store(self, version: str, computed: dict, repeats: int = 0):
+        with self._lock:
+            self._stats["misses"] += len(computed)
+            if repeats:
+                cost = next(iter(computed.values()))[1]
+                self._stats["memory_hits"] += repeats
+                self._stats["time_saved_seconds"] += repeats * cost
+            for key, entry in computed.items():
+                self._remember(key, entry)
+                self._stats["classify_seconds"] += entry[1]
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sentiment_results (key, version, score, cost) VALUES (?, ?, ?, ?)",
+                    [(key, version, score, cost) for key, (score, cost) in computed.items()]
+                )
+                self._db.commit()
+
+    def _remember(self, key: bytes, entry: tuple):
+        # Caller must hold self._lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -1,9 +1,15 @@
+import hashlib
 import string
 
 class SimpleSentimentService:
     """
     A simple, rule-based sentiment classification service.
     This is pluggable and can be replaced with a more complex ML model.
+
+    A replacement should keep the same interface: `classify`,
+    `classify_many`, `normalize` (a text transformation that never changes
+    the score) and `version` (changes whenever results may change), which
+    the result cache relies on.
     """
     def __init__(self):
         # Simple keyword matching. Can be expanded significantly.
@@ -20,6 +26,46 @@ class SimpleSentimentService:
         # self.positive_emojis = {"😊", "👍", "❤️"}
         # self.negative_emojis = {"😞", "👎", "😠"}
 
+    # The word lists are frozen; assign a new set to change them, which
+    # also gives the classifier a new `version`.
+    @property
+    def positive_words(self):
+        return self._positive_words
+
+    @positive_words.setter
+    def positive_words(self, words):
+        self._positive_words = frozenset(words)
+        self._version = None
+
+    @property
+    def negative_words(self):
+        return self._negative_words
+
+    @negative_words.setter
+    def negative_words(self, words):
+        self._negative_words = frozenset(words)
+        self._version = None
+
+    @property
+    def version(self) -> str:
+        """
+        Identifies the classifier and its lexicon, so cached results are
+        invalidated as soon as the word lists change.
+        """
+        if self._version is None:
+            lexicon = "+" + ",".join(sorted(self.positive_words)) + "-" + ",".join(sorted(self.negative_words))
+            self._version = "simple-" + hashlib.blake2b(lexicon.encode('utf-8'), digest_size=8).hexdigest()
+        return self._version
+
+    def normalize(self, text: str) -> str:
+        """
+        Normalize text: lowercase, remove punctuation, collapse whitespace.
+        """
+        return " ".join(text.lower().translate(str.maketrans('', '', string.punctuation)).split())
+
+    def classify_many(self, texts: list) -> list:
+        return [self.classify(text) for text in texts]
+
     def classify(self, text: str) -> float:
         """
         Classifies text and returns a score from 1 (very negative) to 5 (very positive).
@@ -32,9 +78,7 @@ class SimpleSentimentService:
         if not text:
             return 3.0  # Neutral for empty feedback
 
-        # Normalize text: lowercase, remove punctuation
-        normalized_text = text.lower().translate(str.maketrans('', '', string.punctuation))
-        words = set(normalized_text.split())
+        words = set(self.normalize(text).split())
 
         score = 3.0  # Start neutral
         
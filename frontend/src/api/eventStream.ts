@@ -0,0 +1,48 @@
+// src/api/eventStream.ts
+import api from "./axiosInstance";
+
+type StreamHandlers = {
+  onScore?: (data: any) => void;
+  onAlert?: (data: any) => void;
+  onDropped?: () => void;
+};
+
+// EventSource cannot send the Authorization header, so fetch a
+// short-lived stream token (with the usual header) and pass it in the URL.
+// Returns a function that closes the stream.
+export function openAdminEventStream(driverIds: string[], handlers: StreamHandlers) {
+  let source: EventSource | null = null;
+  let closed = false;
+
+  const connect = async () => {
+    const { data } = await api.post("/admin/stream/token");
+    if (closed) return;
+
+    const params = new URLSearchParams({ token: data.stream_token });
+    if (driverIds.length) params.set("driver_id", driverIds.join(","));
+    source = new EventSource(`${api.defaults.baseURL}/admin/stream?${params}`);
+
+    source.addEventListener("score", (e) => handlers.onScore?.(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener("alert", (e) => handlers.onAlert?.(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener("dropped", () => {
+      handlers.onDropped?.();
+      reconnect();
+    });
+    // The token is single-use in practice: it expires soon after the
+    // stream opens, so every reconnect needs a fresh one
+    source.onerror = () => reconnect();
+  };
+
+  const reconnect = () => {
+    source?.close();
+    source = null;
+    if (!closed) setTimeout(() => connect().catch(() => reconnect()), 5000);
+  };
+
+  connect().catch(() => reconnect());
+
+  return () => {
+    closed = true;
+    source?.close();
+  };
+}